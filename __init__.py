@@ -1,74 +1,154 @@
 import os
 
 from flask import Flask
+from werkzeug.utils import import_string
+from iam.cli import iam_cli
+from iam.common.jwt_user import UndecodablePermissionsError
 from iam.models import db, migrate
-from iam.routes.token import get_token_route, refresh_token_route
-from iam.routes.user import \
-    create_user_route,\
-    get_users_route, \
-    get_user_route, \
-    edit_user_route, \
-    delete_user_route
-from iam.routes.group import \
-    create_group_route, \
-    get_groups_route, \
-    get_group_route, \
-    edit_group_route, \
-    delete_group_route
-from iam.routes.permission import \
-    create_permission_route, \
-    get_permissions_route, \
-    get_permission_route, \
-    edit_permission_route, \
-    delete_permission_route
+from iam.library.engine import apply_engine_profile, install_engine_events
+from iam.library.json_provider import json_provider
+from iam.library.metrics import request_metrics
+from iam.library.password import password_hasher, HasherBusyError
+from iam.library.query_budget import query_budgets
+from iam.library.permission_cache import permission_cache
+from iam.library.permission_catalog import clear_catalogs
+from iam.library.rbac_snapshot import rbac_graph
+from iam.library.revocation import revocation_list
+from iam.library.signing_keys import configure_signing
 from flask_jwt_extended import JWTManager
 
+BLUEPRINTS = [
+    'iam.routes.token:get_token_route',
+    'iam.routes.token:refresh_token_route',
+    'iam.routes.token:revoke_token_route',
+    'iam.routes.user:create_user_route',
+    'iam.routes.user:get_users_route',
+    'iam.routes.user:get_user_route',
+    'iam.routes.user:edit_user_route',
+    'iam.routes.user:delete_user_route',
+    'iam.routes.user:import_users_route',
+    'iam.routes.user:export_users_route',
+    'iam.routes.group:create_group_route',
+    'iam.routes.group:get_groups_route',
+    'iam.routes.group:get_group_route',
+    'iam.routes.group:edit_group_route',
+    'iam.routes.group:get_group_users_route',
+    'iam.routes.group:get_group_permissions_route',
+    'iam.routes.group:get_group_groups_route',
+    'iam.routes.group:delete_group_route',
+    'iam.routes.permission:create_permission_route',
+    'iam.routes.permission:get_permissions_route',
+    'iam.routes.permission:get_permission_route',
+    'iam.routes.permission:edit_permission_route',
+    'iam.routes.permission:delete_permission_route',
+    'iam.routes.permission:get_permission_catalog_route',
+    'iam.routes.permission:get_permission_groups_route',
+    'iam.routes.changes:get_changes_route',
+    'iam.routes.authorize:authorize_route',
+    'iam.routes.jwks:jwks_route',
+    'iam.routes.metrics:metrics_route',
+]
+
 
 def create_app():
     app: Flask = Flask(__name__, instance_relative_config=True)
     app.config.from_mapping(
         SECRET_KEY='dev',
         SQLALCHEMY_DATABASE_URI='sqlite:///iam.db',
-        JWT_SECRET_KEY='dev'
+        JWT_SECRET_KEY='dev',
+        PERMISSION_CACHE_SIZE=10000,
+        PERMISSION_CACHE_TTL=300,
+        PERMISSION_CATALOG_TTL=60,
+        JWT_COMPACT_PERMISSIONS=False,
+        PASSWORD_HASH_METHOD='scrypt',
+        PASSWORD_SALT_LENGTH=16,
+        PASSWORD_HASH_EXECUTOR='thread',
+        PASSWORD_HASH_WORKERS=4,
+        PASSWORD_HASH_QUEUE_LIMIT=32,
+        PASSWORD_HASH_TIMEOUT=10,
+        PAGINATION_MAX_PER_PAGE=100,
+        SEARCH_BACKEND='auto',
+        BULK_IMPORT_CHUNK_SIZE=1000,
+        EXPORT_BATCH_SIZE=1000,
+        AUTHORIZE_MAX_CHECKS=1000,
+        JWT_SIGNING_KEYS=[],
+        JWT_SIGNING_KID=None,
+        JWKS_MAX_AGE=300,
+        REVOCATION_REFRESH_INTERVAL=5,
+        REQUIRE_ACTIVE_USERS=False,
+        DB_POOL_SIZE=10,
+        DB_MAX_OVERFLOW=20,
+        DB_POOL_PRE_PING=True,
+        DB_POOL_RECYCLE=1800,
+        SQLITE_JOURNAL_MODE='WAL',
+        SQLITE_SYNCHRONOUS='NORMAL',
+        SQLITE_BUSY_TIMEOUT=5000,
+        SQLITE_MMAP_SIZE=268435456,
+        SQLITE_CACHE_SIZE=-65536,
+        SQLITE_IMMEDIATE_WRITES=True,
+        SQLITE_DEFERRED_ENDPOINTS=['get_token.get_token', 'authorize.authorize'],
+        METRICS_ENABLED=False,
+        QUERY_BUDGET_MODE=None,
+        JSON_PROVIDER='auto',
+        MEMBERSHIP_PREVIEW_SIZE=10,
+        CHANGE_FEED_POLL_INTERVAL=1,
+        CHANGE_FEED_MAX_WAIT=30,
+        CHANGE_FEED_HEARTBEAT=15,
+        CHANGE_FEED_STREAM_MAX=300,
+        CHANGE_LOG_RETENTION=7 * 24 * 3600
     )
-    JWTManager(app)
+    jwt = JWTManager(app)
 
     app.config.from_pyfile('iam_config.py', silent=True)
+    app.config.from_envvar('IAM_SETTINGS', silent=True)
+    permission_cache.configure(
+        max_size=app.config['PERMISSION_CACHE_SIZE'],
+        ttl=app.config['PERMISSION_CACHE_TTL']
+    )
+    rbac_graph.clear()
+    clear_catalogs()
+    password_hasher.configure(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        salt_length=app.config['PASSWORD_SALT_LENGTH'],
+        executor=app.config['PASSWORD_HASH_EXECUTOR'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        queue_limit=app.config['PASSWORD_HASH_QUEUE_LIMIT'],
+        timeout=app.config['PASSWORD_HASH_TIMEOUT']
+    )
+    configure_signing(app, jwt)
+    revocation_list.configure(refresh_interval=app.config['REVOCATION_REFRESH_INTERVAL'])
+    jwt.token_in_blocklist_loader(lambda jwt_header, jwt_payload: revocation_list.is_revoked(jwt_payload))
+    app.json = json_provider(app)
+    app.register_error_handler(HasherBusyError, lambda e: (e.response, e.code))
+    app.register_error_handler(UndecodablePermissionsError, lambda e: ({'error': e.description}, e.code))
 
     try:
         os.makedirs(app.instance_path)
     except OSError:
         pass
 
+    apply_engine_profile(app)
     db.init_app(app)
+    install_engine_events(app)
+    with app.app_context():
+        request_metrics.init_app(app, db.engine)
+        query_budgets.init_app(app, db.engine)
     migrate.init_app(app, db, compare_type=True)
-    app.app_context().push()
-    db.create_all()
 
-    for route in [
-        get_token_route,
-        refresh_token_route,
-        create_user_route,
-        get_users_route,
-        get_user_route,
-        edit_user_route,
-        delete_user_route,
-        create_group_route,
-        get_groups_route,
-        get_group_route,
-        edit_group_route,
-        delete_group_route,
-        create_permission_route,
-        get_permissions_route,
-        get_permission_route,
-        edit_permission_route,
-        delete_permission_route
-    ]:
-        app.register_blueprint(route)
+    for blueprint in BLUEPRINTS:
+        app.register_blueprint(import_string(blueprint))
+    app.cli.add_command(iam_cli)
     return app
 
 
-app = create_app()
+def __getattr__(name):
+    # `flask --app iam:app` and WSGI servers pointed at iam:app build the app on first access.
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
 
 if __name__ == "__main__":
-    app.run()
+    create_app().run()
@@ -0,0 +1,30 @@
+import argparse
+import json
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files, e.g. from two commits.')
+    parser.add_argument('baseline', type=argparse.FileType('r'))
+    parser.add_argument('candidate', type=argparse.FileType('r'))
+    parser.add_argument('--threshold', type=float, default=10, help='p50/p99 slowdown in percent that fails.')
+    args = parser.parse_args()
+
+    baseline, candidate = json.load(args.baseline), json.load(args.candidate)
+    print(f'{baseline["benchmark"]}: {baseline["commit"]} -> {candidate["commit"]}')
+    regressed = False
+    for name, new in candidate['results'].items():
+        old = baseline['results'].get(name)
+        if old is None:
+            continue
+        changes = []
+        for metric in ('p50_ms', 'p99_ms'):
+            change = (new[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0
+            regressed |= change > args.threshold
+            changes.append(f'{metric} {old[metric]:.3f} -> {new[metric]:.3f} ({change:+.1f}%)')
+        print(f'{name:>24}: ' + '  '.join(changes))
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == '__main__':
+    main()
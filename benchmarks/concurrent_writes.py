@@ -0,0 +1,73 @@
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+import uuid
+
+app = None
+
+
+def write(args):
+    group_id, transactions = args
+    from iam.models import db, Group
+
+    failures = 0
+    for i in range(transactions):
+        # Same shape as the edit endpoints: read the row, then write it back.
+        with app.test_request_context(method='PUT'):
+            try:
+                group = db.session.get(Group, group_id)
+                time.sleep(0.001)
+                group.name = f'group-{os.getpid()}-{i}'
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                failures += 1
+            finally:
+                db.session.remove()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Failed read-then-write transactions under concurrent writers.')
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--transactions', type=int, default=100)
+    parser.add_argument('--no-profile', action='store_true',
+                        help='rollback journal, no busy timeout and deferred transactions')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings = os.path.join(directory, 'settings.py')
+        with open(settings, 'w') as f:
+            f.write(f"SQLALCHEMY_DATABASE_URI = 'sqlite:///{directory}/bench.db'\n")
+            if args.no_profile:
+                f.write("SQLITE_JOURNAL_MODE = 'DELETE'\nSQLITE_BUSY_TIMEOUT = 0\nSQLITE_IMMEDIATE_WRITES = False\n")
+        os.environ['IAM_SETTINGS'] = settings
+
+        from iam import create_app
+        from iam.models import db, Group
+
+        global app
+        app = create_app()
+
+        group_id = str(uuid.uuid4())
+        with app.app_context():
+            db.create_all()
+            db.session.add(Group(id=group_id, name='group'))
+            db.session.commit()
+            db.session.remove()
+            db.engine.dispose()
+
+        start = time.perf_counter()
+        with multiprocessing.get_context('fork').Pool(args.processes) as pool:
+            failures = sum(pool.map(write, [(group_id, args.transactions)] * args.processes))
+        elapsed = time.perf_counter() - start
+
+    total = args.processes * args.transactions
+    print(f'{total} transactions from {args.processes} processes: {failures} failed, '
+          f'{total / elapsed:.0f} tx/s')
+
+
+if __name__ == '__main__':
+    main()
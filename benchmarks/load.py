@@ -0,0 +1,150 @@
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+from iam.benchmarks.results import print_results, summarize, write_results
+
+SCENARIOS = ['token', 'list_users', 'search_users', 'edit_group']
+
+
+class Client:
+    def __init__(self, url: str, token: str = None):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.token = token
+        self._local = threading.local()
+
+    def request(self, method: str, path: str, body=None):
+        # One keep-alive connection per worker thread.
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(self.host, self.port)
+        headers = {'Content-Type': 'application/json'}
+        if self.token is not None:
+            headers['Authorization'] = f'Bearer {self.token}'
+        connection.request(method, path, json.dumps(body) if body is not None else None, headers)
+        response = connection.getresponse()
+        return response.status, response.read()
+
+
+def fetch_all(client: Client, path: str, pages: Optional[int] = None) -> Tuple[list, list]:
+    # Keyset pages followed through `next`; returns the rows and the cursor of every page.
+    rows, cursors, cursor = [], [], ''
+    while cursor is not None and (pages is None or len(cursors) < pages):
+        cursors.append(cursor)
+        body = json.loads(client.request('GET', f'{path}?per_page=100&after={quote(cursor)}')[1])
+        rows += body['data']
+        cursor = body['next']
+    return rows, cursors
+
+
+def scenario_requests(name: str, rng: random.Random, args, group_ids: list, permission_names: list,
+                      user_cursors: list):
+    if name == 'token':
+        return 'POST', '/api/iam/token', {'username': f'user{rng.randrange(args.users)}', 'password': args.password}
+    if name == 'list_users':
+        return 'GET', f'/api/iam/user?per_page=50&after={quote(rng.choice(user_cursors))}', None
+    if name == 'search_users':
+        return 'GET', f'/api/iam/user?search=user{rng.randrange(args.users)}', None
+    return 'PUT', f'/api/iam/group/{rng.choice(group_ids)}', {'permissions': rng.sample(permission_names, 5)}
+
+
+def run_scenario(client: Client, name: str, args, group_ids: list, permission_names: list,
+                 user_cursors: list) -> dict:
+    rng = random.Random(name)
+    requests = [
+        scenario_requests(name, rng, args, group_ids, permission_names, user_cursors) for _ in range(args.requests)
+    ]
+    errors = []
+
+    def send(request):
+        start = time.perf_counter()
+        status, _ = client.request(*request)
+        if status >= 400:
+            errors.append(status)
+        return (time.perf_counter() - start) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        timings = list(pool.map(send, requests))
+    summary = summarize(timings, time.perf_counter() - started)
+    summary['errors'] = len(errors)
+    return summary
+
+
+def serve_seeded(args, directory: str) -> str:
+    import flask_migrate
+    import iam
+    from werkzeug.serving import make_server
+    from iam.benchmarks.seed import seed
+    from iam.models import db
+
+    settings = os.path.join(directory, 'settings.py')
+    with open(settings, 'w') as f:
+        f.write(f"SQLALCHEMY_DATABASE_URI = 'sqlite:///{directory}/bench.db'\n")
+    os.environ['IAM_SETTINGS'] = settings
+
+    app = iam.create_app()
+    with app.app_context():
+        flask_migrate.upgrade(directory=os.path.join(os.path.dirname(iam.__file__), 'migrations'))
+        seed(db, args.users, args.groups, args.permissions, args.fan_out, password=args.password)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP load driver reporting p50/p99 latency and requests per second.')
+    parser.add_argument('--url', help='running service seeded by iam.benchmarks.seed; '
+                                      'by default a seeded local server is started')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f'any of {", ".join(SCENARIOS)}')
+    parser.add_argument('--requests', type=int, default=500, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--groups', type=int, default=200)
+    parser.add_argument('--permissions', type=int, default=500)
+    parser.add_argument('--fan-out', type=int, default=3)
+    parser.add_argument('--password', default='password', help='password of the seeded users')
+    parser.add_argument('--admin-user', default='admin')
+    parser.add_argument('--admin-password', default='admin')
+    parser.add_argument('--json', help='write machine-readable results to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = args.url or serve_seeded(args, directory)
+        status, body = Client(url).request(
+            'POST', '/api/iam/token', {'username': args.admin_user, 'password': args.admin_password}
+        )
+        if status != 200:
+            parser.error(f'admin login failed with {status}')
+        client = Client(url, json.loads(body)['access_token'])
+        groups, _ = fetch_all(client, '/api/iam/group')
+        group_ids = [g['id'] for g in groups if g['name'].startswith('group')]
+        permission_names = [p['name'] for p in fetch_all(client, '/api/iam/permission/')[0]]
+        # Start pages spread over the first thousand users, reached the way clients reach them.
+        _, user_cursors = fetch_all(client, '/api/iam/user', pages=10)
+
+        results = {}
+        for name in args.scenarios.split(','):
+            results[name] = run_scenario(client, name, args, group_ids, permission_names, user_cursors)
+
+    print_results(results)
+    for name, summary in results.items():
+        if summary['errors']:
+            print(f'{name}: {summary["errors"]} failed requests')
+    if args.json:
+        write_results(args.json, 'load', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
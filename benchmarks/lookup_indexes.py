@@ -0,0 +1,100 @@
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import uuid
+
+SCHEMA = [
+    'CREATE TABLE user (id VARCHAR(122) PRIMARY KEY, active BOOLEAN, username VARCHAR(122), '
+    'name VARCHAR(122), password_hash VARCHAR(122))',
+    'CREATE TABLE "group" (id VARCHAR(122) PRIMARY KEY, name VARCHAR(122) UNIQUE)',
+    'CREATE TABLE permission (id VARCHAR(122) PRIMARY KEY, name VARCHAR(122) UNIQUE, description TEXT)',
+    'CREATE TABLE users_to_groups (group_id VARCHAR(122), user_id VARCHAR(122))',
+    'CREATE TABLE group_to_permissions (permission_id VARCHAR(122), group_id VARCHAR(122))',
+]
+
+# Same end state as migration 9c41d7e2a8b3 on an empty-duplicate database.
+MIGRATION = [
+    'CREATE UNIQUE INDEX ix_user_username ON user (username)',
+    'CREATE UNIQUE INDEX pk_users_to_groups ON users_to_groups (group_id, user_id)',
+    'CREATE INDEX ix_users_to_groups_user_id ON users_to_groups (user_id, group_id)',
+    'CREATE UNIQUE INDEX pk_group_to_permissions ON group_to_permissions (group_id, permission_id)',
+    'CREATE INDEX ix_group_to_permissions_permission_id ON group_to_permissions (permission_id, group_id)',
+]
+
+IDENTITY_QUERY = (
+    'SELECT u.id, g.name, p.name FROM user u '
+    'LEFT JOIN users_to_groups ug ON ug.user_id = u.id '
+    'LEFT JOIN "group" g ON g.id = ug.group_id '
+    'LEFT JOIN group_to_permissions gp ON gp.group_id = g.id '
+    'LEFT JOIN permission p ON p.id = gp.permission_id '
+    'WHERE u.username = ?'
+)
+
+
+def seed(conn: sqlite3.Connection, users: int, groups: int, permissions: int, fan_out: int):
+    for statement in SCHEMA:
+        conn.execute(statement)
+    group_ids = [str(uuid.uuid4()) for _ in range(groups)]
+    permission_ids = [str(uuid.uuid4()) for _ in range(permissions)]
+    conn.executemany('INSERT INTO "group" (id, name) VALUES (?, ?)', ((g, f'group{i}') for i, g in enumerate(group_ids)))
+    conn.executemany('INSERT INTO permission (id, name) VALUES (?, ?)',
+                     ((p, f'permission{i}') for i, p in enumerate(permission_ids)))
+    conn.executemany('INSERT INTO group_to_permissions VALUES (?, ?)',
+                     ((p, g) for g in group_ids for p in random.sample(permission_ids, min(5, permissions))))
+
+    batch = 50000
+    for start in range(0, users, batch):
+        rows = [(str(uuid.uuid4()), f'user{i}') for i in range(start, min(start + batch, users))]
+        conn.executemany('INSERT INTO user (id, active, username) VALUES (?, 1, ?)', rows)
+        conn.executemany('INSERT INTO users_to_groups VALUES (?, ?)',
+                         ((g, u) for u, _ in rows for g in random.sample(group_ids, fan_out)))
+    conn.commit()
+
+
+def measure(conn: sqlite3.Connection, users: int, lookups: int) -> dict:
+    names = [f'user{random.randrange(users)}' for _ in range(lookups)]
+    results = {}
+    for label, query in [
+        ('username lookup', 'SELECT id FROM user WHERE username = ?'),
+        ('identity join', IDENTITY_QUERY),
+    ]:
+        start = time.perf_counter()
+        for name in names:
+            conn.execute(query, (name,)).fetchall()
+        results[label] = (time.perf_counter() - start) / lookups * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lookup latency before and after the lookup index migration.')
+    parser.add_argument('--users', type=int, default=1000000)
+    parser.add_argument('--groups', type=int, default=200)
+    parser.add_argument('--permissions', type=int, default=500)
+    parser.add_argument('--fan-out', type=int, default=3)
+    parser.add_argument('--lookups', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        conn = sqlite3.connect(os.path.join(directory, 'bench.db'))
+        start = time.perf_counter()
+        seed(conn, args.users, args.groups, args.permissions, args.fan_out)
+        print(f'seeded {args.users} users in {time.perf_counter() - start:.1f}s')
+
+        before = measure(conn, args.users, args.lookups)
+        start = time.perf_counter()
+        for statement in MIGRATION:
+            conn.execute(statement)
+        conn.commit()
+        print(f'migration took {time.perf_counter() - start:.1f}s')
+        after = measure(conn, args.users, args.lookups)
+        conn.close()
+
+    for label in before:
+        print(f'{label:<16} before {before[label]:10.3f} ms  after {after[label]:8.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
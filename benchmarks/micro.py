@@ -0,0 +1,96 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from iam.benchmarks.results import print_results, summarize, write_results
+
+
+def measure(fn, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return summarize(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmarks of identity and serialization hot paths.')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--groups', type=int, default=200)
+    parser.add_argument('--permissions', type=int, default=500)
+    parser.add_argument('--fan-out', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=2000)
+    parser.add_argument('--json', help='write machine-readable results to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings = os.path.join(directory, 'settings.py')
+        with open(settings, 'w') as f:
+            f.write(f"SQLALCHEMY_DATABASE_URI = 'sqlite:///{directory}/bench.db'\n")
+        os.environ['IAM_SETTINGS'] = settings
+
+        from flask import current_app
+        from flask_jwt_extended import create_access_token, verify_jwt_in_request
+        from iam import create_app
+        from iam.benchmarks.seed import seed
+        from iam.library.iam_jwt_user import IamJwtUser
+        from iam.library.identity import load_identity
+        from iam.library.membership import group_detail
+        from iam.library.permission_cache import permission_cache
+        from iam.models import db, User, Group
+
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+            seeded = seed(db, args.users, args.groups, args.permissions, args.fan_out)
+            rng = random.Random(0)
+            users = [db.session.get(User, u) for u in rng.sample(seeded.user_ids, 100)]
+            groups = [db.session.get(Group, g) for g in rng.sample(seeded.group_ids, 10)]
+
+            # Each request starts with an empty session, so rows and relationships load again.
+            def cold_permissions():
+                permission_cache.clear()
+                db.session.expire_all()
+                rng.choice(users).permissions
+
+            def group_full_json():
+                db.session.expire_all()
+                current_app.json.dumps(group_detail(rng.choice(groups)))
+
+            def token_identity():
+                db.session.expire_all()
+                load_identity(id=rng.choice(users).id)
+
+            results = {
+                'user_permissions_cold': measure(cold_permissions, args.repeat),
+                'load_identity': measure(token_identity, args.repeat),
+            }
+            [user.permissions for user in users]
+            results.update({
+                'user_permissions_warm': measure(lambda: rng.choice(users).permissions, args.repeat),
+                'user_identity': measure(lambda: rng.choice(users).identity, args.repeat),
+                'user_short_json': measure(lambda: current_app.json.dumps(rng.choice(users).short), args.repeat),
+                'group_full_json': measure(group_full_json, args.repeat),
+            })
+
+            token = create_access_token(identity=users[0].identity)
+            with app.test_request_context(headers={'Authorization': f'Bearer {token}'}):
+                verify_jwt_in_request()
+                results['jwt_user_init'] = measure(IamJwtUser, args.repeat)
+                jwt_user = IamJwtUser()
+                names = seeded.permission_names
+                results['jwt_user_has_rights'] = measure(lambda: jwt_user.has_rights(rng.choice(names)), args.repeat)
+
+            db.session.remove()
+            db.engine.dispose()
+
+    print_results(results)
+    if args.json:
+        write_results(args.json, 'micro', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from iam.library.password import PasswordHasher
+
+METHODS = [
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:260000',
+    'scrypt:32768:8:1',
+    'scrypt:16384:8:1',
+]
+PASSWORD = 'benchmark-password'
+
+
+def logins_per_second(method: str, executor: str, workers: int, clients: int, logins: int) -> float:
+    hasher = PasswordHasher()
+    hasher.configure(method=method, executor=executor, workers=workers, queue_limit=clients)
+    password_hash = hasher.hash(PASSWORD)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        assert all(pool.map(lambda _: hasher.check(password_hash, PASSWORD), range(logins)))
+    return logins / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Password check throughput per KDF setting.')
+    parser.add_argument('--logins', type=int, default=40)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--executor', default='thread', choices=['inline', 'thread', 'process'])
+    parser.add_argument('--method', action='append', help='KDF method, may be repeated')
+    args = parser.parse_args()
+
+    for method in args.method or METHODS:
+        rate = logins_per_second(method, args.executor, args.workers, args.clients, args.logins)
+        print(f'{method:<24} {args.executor:<8} {rate:8.1f} logins/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+import argparse
+import random
+import time
+
+from iam.benchmarks.results import print_results, summarize, write_results
+
+ACTIONS = ('read', 'write', 'delete', 'admin')
+
+
+def scan_matches(grants: list, permission: str) -> bool:
+    # The straightforward alternative: test every (pre-split) grant, segment by segment.
+    segments = permission.split(':')
+    for parts in grants:
+        if parts[-1] == '*' and len(parts) <= len(segments):
+            parts, candidate = parts[:-1], segments[:len(parts) - 1]
+        elif len(parts) == len(segments):
+            candidate = segments
+        else:
+            continue
+        if all(part == '*' or part == segment for part, segment in zip(parts, candidate)):
+            return True
+    return False
+
+
+def measure(check, permissions: list, batch: int, repeat: int) -> dict:
+    timings = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        batch_start = time.perf_counter()
+        for permission in permissions[:batch]:
+            check(permission)
+        timings.append((time.perf_counter() - batch_start) * 1000)
+    summary = summarize(timings, time.perf_counter() - start)
+    summary['checks_per_s'] = summary.pop('rps') * batch
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Permission checks per second: list scan vs set vs compiled matcher.')
+    parser.add_argument('--services', type=int, default=20)
+    parser.add_argument('--resources', type=int, default=25)
+    parser.add_argument('--grants', type=int, default=200)
+    parser.add_argument('--wildcards', type=int, default=10)
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--json', help='write machine-readable results to this file')
+    args = parser.parse_args()
+
+    from flask import Flask
+    from flask_jwt_extended import JWTManager, create_access_token, verify_jwt_in_request
+    from iam.common.jwt_user import JwtUser
+    from iam.common.permission_matcher import PermissionMatcher, compile_grants
+
+    rng = random.Random(0)
+    universe = [
+        f'svc{s}:resource{r}:{action}'
+        for s in range(args.services) for r in range(args.resources) for action in ACTIONS
+    ]
+    exact = rng.sample(universe, args.grants)
+    wildcards = [
+        rng.choice((f'svc{s}:*', f'svc{s}:*:read', f'svc{s}:resource{rng.randrange(args.resources)}:*'))
+        for s in rng.sample(range(args.services), args.wildcards)
+    ]
+    # Requests check the same few rights over and over, granted or not.
+    checks = [rng.choice(universe) for _ in range(args.batch // 10)] * 10
+    rng.shuffle(checks)
+
+    results = {}
+    as_list, as_set = list(exact), frozenset(exact)
+    results['list_scan'] = measure(lambda p: p in as_list, checks, args.batch, args.repeat)
+    results['frozenset'] = measure(lambda p: p in as_set, checks, args.batch, args.repeat)
+    results['matcher_exact'] = measure(PermissionMatcher(exact).matches, checks, args.batch, args.repeat)
+
+    mixed = exact + wildcards
+    split = [grant.split(':') for grant in mixed]
+    results['scan_wildcard'] = measure(lambda p: scan_matches(split, p), checks, args.batch, args.repeat)
+    results['matcher_wildcard'] = measure(PermissionMatcher(mixed).matches, checks, args.batch, args.repeat)
+
+    app = Flask(__name__)
+    app.config.update(JWT_SECRET_KEY='bench', JWT_TOKEN_LOCATION=['headers'])
+    JWTManager(app)
+    with app.app_context():
+        token = create_access_token(identity={'id': 'bench', 'username': 'bench', 'permissions': mixed})
+
+    with app.test_request_context(headers={'Authorization': f'Bearer {token}'}):
+        verify_jwt_in_request()
+        compile_grants.cache_clear()
+        user = JwtUser()
+        results['has_rights_cached'] = measure(user.has_rights, checks, args.batch, args.repeat)
+
+    print_results(results)
+    for name, summary in results.items():
+        print(f'{name:>24}: {summary["checks_per_s"]:,.0f} checks/s')
+    if args.json:
+        write_results(args.json, 'permission_matcher', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
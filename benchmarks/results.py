@@ -0,0 +1,51 @@
+import json
+import os
+import platform
+import subprocess
+import time
+from typing import List, Optional
+
+
+def percentile(timings: List[float], fraction: float) -> float:
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(timings: List[float], elapsed: Optional[float] = None) -> dict:
+    summary = {
+        'count': len(timings),
+        'p50_ms': percentile(timings, 0.5),
+        'p99_ms': percentile(timings, 0.99),
+        'mean_ms': sum(timings) / len(timings),
+    }
+    if elapsed is not None:
+        summary['rps'] = len(timings) / elapsed
+    return summary
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(__file__),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path: str, benchmark: str, params: dict, results: dict):
+    with open(path, 'w') as f:
+        json.dump({
+            'benchmark': benchmark,
+            'commit': _commit(),
+            'python': platform.python_version(),
+            'timestamp': time.time(),
+            'params': params,
+            'results': results,
+        }, f, indent=2)
+
+
+def print_results(results: dict):
+    for name, summary in results.items():
+        line = f'{name:>24}: p50 {summary["p50_ms"]:.3f} ms  p99 {summary["p99_ms"]:.3f} ms'
+        if 'rps' in summary:
+            line += f'  {summary["rps"]:.0f} req/s'
+        print(line)
@@ -0,0 +1,93 @@
+import argparse
+import os
+import random
+import time
+import uuid
+from typing import List, NamedTuple
+
+BATCH_SIZE = 10000
+
+
+class Seeded(NamedTuple):
+    user_ids: List[str]
+    group_ids: List[str]
+    permission_names: List[str]
+
+
+def _insert(db, table, rows: list):
+    from sqlalchemy import insert
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(insert(table), rows[start:start + BATCH_SIZE])
+
+
+def seed(db, users: int, groups: int, permissions: int, fan_out: int,
+         permissions_per_group: int = 10, password: str = None, random_seed: int = 0) -> Seeded:
+    from iam.library.password import password_hasher
+    from iam.models import User, Group, Permission, users_to_groups, group_to_permissions, group_closure
+
+    rng = random.Random(random_seed)
+
+    def new_id() -> str:
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    group_ids = [new_id() for _ in range(groups)]
+    permission_ids = [new_id() for _ in range(permissions)]
+    permission_names = [f'permission{i}' for i in range(permissions)]
+    user_ids = [new_id() for _ in range(users)]
+    # One hash shared by every seeded user: hashing each password would dominate seeding.
+    password_hash = password_hasher.hash(password) if password is not None else None
+
+    _insert(db, Group.__table__, [{'id': g, 'name': f'group{i}'} for i, g in enumerate(group_ids)])
+    # Bulk inserts skip the ORM hook that gives every group its own closure row.
+    _insert(db, group_closure, [{'ancestor_id': g, 'descendant_id': g, 'depth': 0} for g in group_ids])
+    _insert(db, Permission.__table__, [
+        {'id': p, 'name': n, 'description': n} for p, n in zip(permission_ids, permission_names)
+    ])
+    # Memberships vary around the requested averages instead of being uniform.
+    _insert(db, group_to_permissions, [
+        {'group_id': g, 'permission_id': p}
+        for g in group_ids
+        for p in rng.sample(permission_ids, min(permissions, rng.randint(1, 2 * permissions_per_group - 1)))
+    ])
+    _insert(db, User.__table__, [
+        {'id': u, 'username': f'user{i}', 'name': f'User {i}', 'active': True, 'password_hash': password_hash}
+        for i, u in enumerate(user_ids)
+    ])
+    _insert(db, users_to_groups, [
+        {'group_id': g, 'user_id': u}
+        for u in user_ids
+        for g in rng.sample(group_ids, min(groups, rng.randint(1, 2 * fan_out - 1)))
+    ])
+    db.session.commit()
+    return Seeded(user_ids, group_ids, permission_names)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Migrate the configured database (iam_config.py / IAM_SETTINGS) and fill it with generated data.'
+    )
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--groups', type=int, default=1000)
+    parser.add_argument('--permissions', type=int, default=500)
+    parser.add_argument('--fan-out', type=int, default=3, help='average groups per user')
+    parser.add_argument('--permissions-per-group', type=int, default=10)
+    parser.add_argument('--password', default='password', help='password of every seeded user')
+    parser.add_argument('--random-seed', type=int, default=0)
+    args = parser.parse_args()
+
+    import flask_migrate
+    import iam
+    from iam.models import db
+
+    app = iam.create_app()
+    with app.app_context():
+        flask_migrate.upgrade(directory=os.path.join(os.path.dirname(iam.__file__), 'migrations'))
+        start = time.perf_counter()
+        seed(db, args.users, args.groups, args.permissions, args.fan_out,
+             args.permissions_per_group, args.password, args.random_seed)
+        print(f'Seeded {args.users} users, {args.groups} groups and {args.permissions} permissions '
+              f'into {db.engine.url} in {time.perf_counter() - start:.1f} s')
+
+
+if __name__ == '__main__':
+    main()
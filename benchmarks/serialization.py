@@ -0,0 +1,60 @@
+import argparse
+import os
+import tempfile
+import time
+
+from iam.benchmarks.results import print_results, summarize, write_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and encode a large user list: ORM objects vs column projections.')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', help='write machine-readable results to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings = os.path.join(directory, 'settings.py')
+        with open(settings, 'w') as f:
+            f.write(f"SQLALCHEMY_DATABASE_URI = 'sqlite:///{directory}/bench.db'\n")
+        os.environ['IAM_SETTINGS'] = settings
+
+        from flask.json.provider import DefaultJSONProvider
+        from iam import create_app
+        from iam.benchmarks.seed import seed
+        from iam.library.json_provider import OrjsonProvider, orjson
+        from iam.models import db, User
+
+        app = create_app()
+        providers = {'stdlib': DefaultJSONProvider(app)}
+        if orjson is not None:
+            providers['orjson'] = OrjsonProvider(app)
+
+        loaders = {
+            'orm': lambda: [u.short for u in User.query.limit(args.rows).all()],
+            'projection': lambda: User.short_rows(User.short_query().limit(args.rows).all()),
+        }
+
+        results = {}
+        with app.app_context():
+            db.create_all()
+            seed(db, args.rows, 100, 100, 3)
+            for loader_name, load in loaders.items():
+                for provider_name, provider in providers.items():
+                    timings = []
+                    for _ in range(args.repeat):
+                        db.session.expunge_all()
+                        start = time.perf_counter()
+                        provider.response({'error': None, 'data': load()}).get_data()
+                        timings.append((time.perf_counter() - start) * 1000)
+                    results[f'{loader_name}_{provider_name}'] = summarize(timings)
+            db.session.remove()
+            db.engine.dispose()
+
+    print_results(results)
+    if args.json:
+        write_results(args.json, 'serialization', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Cold start of a fresh interpreter: import iam, create_app() and the first
+# request (a failed login, which touches the database). Importing iam must
+# stay free of app construction and database work.
+TARGET_IMPORT_MS = 1000
+TARGET_TOTAL_MS = 1500
+
+PROBE = '''
+import json, time
+start = time.perf_counter()
+import iam
+imported = time.perf_counter()
+app = iam.create_app()
+created = time.perf_counter()
+response = app.test_client().post('/api/iam/token', json={'username': 'nobody', 'password': 'nothing'})
+assert response.status_code == 401, response.status_code
+served = time.perf_counter()
+print(json.dumps({
+    'import': (imported - start) * 1000,
+    'create_app': (created - imported) * 1000,
+    'first_request': (served - created) * 1000,
+}))
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold start time: import, app factory and first request.')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    import flask_migrate
+    import iam
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings = os.path.join(directory, 'settings.py')
+        with open(settings, 'w') as f:
+            f.write(f"SQLALCHEMY_DATABASE_URI = 'sqlite:///{directory}/bench.db'\n")
+        env = {**os.environ, 'IAM_SETTINGS': settings}
+        os.environ['IAM_SETTINGS'] = settings
+
+        app = iam.create_app()
+        with app.app_context():
+            flask_migrate.upgrade(directory=os.path.join(os.path.dirname(iam.__file__), 'migrations'))
+
+        runs = []
+        for _ in range(args.repeat):
+            output = subprocess.run([sys.executable, '-c', PROBE], env=env, check=True,
+                                    capture_output=True, text=True).stdout
+            runs.append(json.loads(output.splitlines()[-1]))
+
+    for phase in ('import', 'create_app', 'first_request'):
+        print(f'{phase:>14}: median {statistics.median(r[phase] for r in runs):.1f} ms')
+    total = statistics.median(sum(r.values()) for r in runs)
+    print(f'{"total":>14}: median {total:.1f} ms  '
+          f'(target import < {TARGET_IMPORT_MS} ms, total < {TARGET_TOTAL_MS} ms)')
+
+
+if __name__ == '__main__':
+    main()
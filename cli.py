@@ -0,0 +1,52 @@
+import json
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from iam.library.bulk_import import import_users, parse_rows
+from iam.library.change_feed import compact_changes
+from iam.library.export import export_users, format_rows
+from iam.models import db, RevokedToken
+
+iam_cli = AppGroup('iam', help='IAM maintenance commands.')
+
+
+@iam_cli.command('import-users')
+@click.argument('file', type=click.File('rb'))
+@click.option('--format', 'fmt', type=click.Choice(['ndjson', 'csv']), default=None,
+              help='Input format, guessed from the file extension by default.')
+def import_users_command(file, fmt):
+    """Create users from an NDJSON or CSV file and print a per-row error report."""
+    fmt = fmt or ('csv' if file.name.endswith('.csv') else 'ndjson')
+    for entry in import_users(parse_rows(file, fmt), current_app.config['BULK_IMPORT_CHUNK_SIZE']):
+        click.echo(json.dumps(entry))
+
+
+@iam_cli.command('export-users')
+@click.option('--format', 'fmt', type=click.Choice(['ndjson', 'csv']), default='ndjson')
+@click.option('--output', type=click.File('w'), default='-', help='Output file, stdout by default.')
+def export_users_command(fmt, output):
+    """Stream all users with their groups and effective permissions."""
+    for chunk in format_rows(export_users(current_app.config['EXPORT_BATCH_SIZE']), fmt):
+        output.write(chunk)
+
+
+@iam_cli.command('purge-revoked-tokens')
+def purge_revoked_tokens_command():
+    """Delete denylist entries for tokens that have expired anyway."""
+    # The newest row stays: it holds the id high-water mark the workers read from.
+    newest = db.session.query(db.func.max(RevokedToken.id)).scalar()
+    deleted = RevokedToken.query.filter(RevokedToken.expires_at < time.time(), RevokedToken.id != newest) \
+        .delete(synchronize_session=False)
+    db.session.commit()
+    click.echo(f'Deleted {deleted} expired revoked tokens.')
+
+
+@iam_cli.command('compact-changes')
+@click.option('--retention', type=float, default=None,
+              help='Seconds of change log to keep, CHANGE_LOG_RETENTION by default.')
+def compact_changes_command(retention):
+    """Delete change log entries older than the retention window."""
+    retention = current_app.config['CHANGE_LOG_RETENTION'] if retention is None else retention
+    deleted = compact_changes(retention)
+    click.echo(f'Deleted {deleted} change log entries.')
@@ -0,0 +1,74 @@
+import json
+import time
+import urllib.request
+from threading import Lock
+from typing import Dict, Optional
+from flask import Flask, current_app
+from jwt import PyJWK
+from jwt.exceptions import InvalidKeyError, InvalidSignatureError
+
+
+class UnknownSigningKeyError(InvalidSignatureError):
+    # The token's kid is retired, rotated out or made up. Handing PyJWT an empty key
+    # instead fails with InvalidKeyError, which no JWT error handler catches.
+    def __init__(self, msg: str = 'Token is signed with an unknown key.'):
+        super().__init__(msg)
+
+
+def handle_unknown_signing_key(app: Flask):
+    # flask_jwt_extended answers InvalidTokenErrors with a 422; an unverifiable token is a 401.
+    app.register_error_handler(
+        UnknownSigningKeyError,
+        lambda e: ({current_app.config.get('JWT_ERROR_MESSAGE_KEY', 'msg'): str(e)}, 401)
+    )
+
+
+class JwksKeyStore:
+    # Verifies IAM tokens locally: public keys come from IAM's jwks.json and are
+    # refetched only when a token names a kid that isn't cached yet.
+    def __init__(self, url: str, min_refresh_interval: float = 60, timeout: float = 5):
+        self.url = url
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self._keys: Dict[str, object] = {}
+        self._fetched_at: Optional[float] = None
+        self._lock = Lock()
+
+    def _fetch(self) -> Dict[str, object]:
+        with urllib.request.urlopen(self.url, timeout=self.timeout) as response:
+            jwks = json.load(response)
+        keys = {}
+        for jwk in jwks.get('keys', []):
+            try:
+                keys[jwk['kid']] = PyJWK(jwk).key
+            except (KeyError, InvalidKeyError):
+                continue
+        return keys
+
+    def refresh(self):
+        keys = self._fetch()
+        with self._lock:
+            self._keys, self._fetched_at = keys, time.monotonic()
+
+    def get(self, kid: str):
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+        with self._lock:
+            now = time.monotonic()
+            if kid not in self._keys and (
+                    self._fetched_at is None or now - self._fetched_at >= self.min_refresh_interval):
+                self._fetched_at = now
+                self._keys = self._fetch()
+        return self._keys.get(kid)
+
+    def decode_key_loader(self, jwt_header: dict, jwt_payload: dict):
+        key = self.get(jwt_header.get('kid'))
+        if key is None:
+            raise UnknownSigningKeyError()
+        return key
+
+    def init_app(self, jwt, app: Optional[Flask] = None):
+        jwt.decode_key_loader(self.decode_key_loader)
+        if app is not None:
+            handle_unknown_signing_key(app)
@@ -1,9 +1,47 @@
+from typing import Callable, Dict, FrozenSet, Optional
 from flask_jwt_extended import get_jwt_identity
+from werkzeug.exceptions import Unauthorized
+from iam.common.permission_catalog import PermissionCatalog
+from iam.common.permission_matcher import PermissionMatcher, compile_grants
+
+
+class UndecodablePermissionsError(Unauthorized):
+    # A compact token whose catalog can't be resolved must not pass as a user without rights.
+    description = 'Token permissions can\'t be decoded, log in again.'
 
 
 class JwtUser:
+    # Resolves a catalog version to a PermissionCatalog for compact tokens.
+    catalog_loader: Optional[Callable[[str], Optional[PermissionCatalog]]] = None
+
     def __init__(self):
         self.identity = get_jwt_identity()
+        self.permissions = self._decode_permissions()
+        self._matcher: Optional[PermissionMatcher] = None
+        # One JwtUser lives for one request; repeated checks of the same right are answered once.
+        self._checked: Dict[str, bool] = {}
+
+    def _decode_permissions(self) -> FrozenSet[str]:
+        if 'permissions' in self.identity:
+            return frozenset(self.identity['permissions'])
+        loader, catalog = type(self).catalog_loader, None
+        if loader is not None:
+            catalog = loader(self.identity.get('perm_catalog'))
+        if catalog is None:
+            raise UndecodablePermissionsError()
+        try:
+            return catalog.decode(self.identity['perm_bits'])
+        except (KeyError, TypeError, ValueError):
+            raise UndecodablePermissionsError()
+
+    @property
+    def matcher(self) -> PermissionMatcher:
+        if self._matcher is None:
+            self._matcher = compile_grants(self.permissions)
+        return self._matcher
 
     def has_rights(self, permission: str) -> bool:
-        return permission in self.identity['permissions']
+        granted = self._checked.get(permission)
+        if granted is None:
+            granted = self._checked[permission] = self.matcher.matches(permission)
+        return granted
@@ -0,0 +1,29 @@
+import base64
+import hashlib
+from typing import Iterable, FrozenSet
+
+
+class PermissionCatalog:
+    def __init__(self, names: Iterable[str]):
+        self.names = tuple(sorted(set(names)))
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.version = hashlib.sha1('\n'.join(self.names).encode()).hexdigest()[:12]
+
+    def missing(self, permissions: Iterable[str]) -> FrozenSet[str]:
+        return frozenset(name for name in permissions if name not in self.index)
+
+    def encode(self, permissions: Iterable[str]) -> str:
+        # A name outside the catalog can't be encoded; dropping it would silently take the right away.
+        missing = self.missing(permissions)
+        if missing:
+            raise ValueError(f'Permissions not in catalog {self.version}: {", ".join(sorted(missing))}')
+        bits = 0
+        for name in permissions:
+            bits |= 1 << self.index[name]
+        raw = bits.to_bytes((len(self.names) + 7) // 8, 'little')
+        return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+    def decode(self, encoded: str) -> FrozenSet[str]:
+        raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+        bits = int.from_bytes(raw, 'little')
+        return frozenset(name for i, name in enumerate(self.names) if bits >> i & 1)
@@ -0,0 +1,70 @@
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List
+
+SEPARATOR = ':'
+WILDCARD = '*'
+_GRANT = object()
+
+
+class PermissionMatcher:
+    # Grants such as 'svc:resource:action', compiled into a trie over ':' segments.
+    # A '*' segment matches any one segment, or everything below it when it comes last:
+    # 'billing:*:read' grants 'billing:invoices:read', 'billing:*' grants every billing right.
+    def __init__(self, grants: Iterable[str]):
+        self.exact = set()
+        self._root: Dict = {}
+        for grant in grants:
+            segments = grant.split(SEPARATOR)
+            if WILDCARD not in segments:
+                self.exact.add(grant)
+                continue
+            node = self._root
+            for segment in segments:
+                node = node.setdefault(segment, {})
+            node[_GRANT] = grant
+
+    def matches(self, permission: str) -> bool:
+        if permission in self.exact:
+            return True
+        if not self._root:
+            return False
+        return self._matches(self._root, permission.split(SEPARATOR), 0)
+
+    def _matches(self, node: Dict, segments: List[str], i: int) -> bool:
+        if i == len(segments):
+            return _GRANT in node
+        child = node.get(segments[i])
+        if child is not None and self._matches(child, segments, i + 1):
+            return True
+        wildcard = node.get(WILDCARD)
+        if wildcard is None:
+            return False
+        return _GRANT in wildcard or self._matches(wildcard, segments, i + 1)
+
+    def matching(self, permission: str) -> List[str]:
+        # Every grant that covers `permission`, for callers that index grants.
+        found = [permission] if permission in self.exact else []
+        if self._root:
+            self._collect(self._root, permission.split(SEPARATOR), 0, found)
+        return found
+
+    def _collect(self, node: Dict, segments: List[str], i: int, found: List[str]):
+        if i == len(segments):
+            if _GRANT in node:
+                found.append(node[_GRANT])
+            return
+        child = node.get(segments[i])
+        if child is not None:
+            self._collect(child, segments, i + 1, found)
+        wildcard = node.get(WILDCARD)
+        if wildcard is not None:
+            # A trailing '*' covering exactly one segment is found by the recursion below.
+            if _GRANT in wildcard and i + 1 < len(segments):
+                found.append(wildcard[_GRANT])
+            self._collect(wildcard, segments, i + 1, found)
+
+
+@lru_cache(maxsize=1024)
+def compile_grants(grants: FrozenSet[str]) -> PermissionMatcher:
+    # Users mostly share a few grant sets; each one is compiled once per process.
+    return PermissionMatcher(grants)
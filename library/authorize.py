@@ -0,0 +1,36 @@
+from collections import defaultdict
+from typing import List, Set, Tuple
+from iam.library.authz_version import global_version_column
+from iam.library.validate import DataValidationError
+from iam.models import group_closure, users_to_groups, effective_memberships, rbac_snapshot
+
+
+def granted_pairs(checks: List[Tuple[str, str]]) -> Set[Tuple[str, str]]:
+    rows = effective_memberships(users_to_groups.c.user_id, group_closure.c.ancestor_id, global_version_column()) \
+        .filter(users_to_groups.c.user_id.in_({user_id for user_id, _ in checks})) \
+        .all()
+    if not rows:
+        return set()
+    groups = defaultdict(list)
+    for user_id, group_id, _ in rows:
+        groups[user_id].append(group_id)
+    snapshot = rbac_snapshot(rows[0][2])
+    bits = {user_id: snapshot.bits(group_ids) for user_id, group_ids in groups.items()}
+    return {
+        (user_id, name) for user_id, name in checks
+        if bits.get(user_id, 0) & snapshot.permission_mask(name)
+    }
+
+
+def validate_checks(checks, max_checks: int) -> list:
+    if not isinstance(checks, list):
+        raise DataValidationError('Checks must be a list of [user_id, permission] pairs.')
+    if len(checks) > max_checks:
+        raise DataValidationError(f'No more than {max_checks} checks per request.')
+    # Strictly pairs of strings: unpacking alone would also take 'ab' or a two-key object.
+    if not all(
+            isinstance(check, (list, tuple)) and len(check) == 2
+            and isinstance(check[0], str) and isinstance(check[1], str)
+            for check in checks):
+        raise DataValidationError('Checks must be a list of [user_id, permission] pairs.')
+    return [(user_id, permission) for user_id, permission in checks]
@@ -0,0 +1,41 @@
+from typing import List, Optional
+from iam.models import db, User, Generation
+
+AUTHZ_GENERATION = 'authz'
+# Bumped by every write that changes what the user list shows.
+USERS_GENERATION = 'users'
+
+
+def generation_column(name: str):
+    return Generation.value_of(name)
+
+
+def generation_value(name: str) -> int:
+    return db.session.query(Generation.value).filter(Generation.name == name).scalar() or 0
+
+
+def bump_generation(name: str):
+    updated = Generation.query.filter_by(name=name) \
+        .update({Generation.value: Generation.value + 1}, synchronize_session=False)
+    if updated == 0:
+        db.session.add(Generation(name=name, value=1))
+
+
+def global_version_column():
+    return generation_column(AUTHZ_GENERATION)
+
+
+def bump_global_version():
+    bump_generation(AUTHZ_GENERATION)
+
+
+def bump_user_version(*user_ids: str):
+    User.query.filter(User.id.in_(user_ids)) \
+        .update({User.authz_version: User.authz_version + 1}, synchronize_session=False)
+
+
+def current_versions(user_id: str) -> Optional[List[int]]:
+    row = db.session.query(User.authz_version, global_version_column()).filter(User.id == user_id).first()
+    if row is None:
+        return None
+    return [row[0], row[1] or 0]
@@ -0,0 +1,151 @@
+import csv
+import json
+from itertools import islice
+from typing import Iterable, Iterator, Optional, Set
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from iam.library.authz_version import USERS_GENERATION, bump_generation
+from iam.library.change_feed import change_feed
+from iam.library.entity_version import bump_versions
+from iam.library.password import password_hasher
+from iam.library.query_budget import QueryBudget
+from iam.library.validate import validate_username, validate_password, validate_name, DataValidationError
+from iam.models import db, generate_uuid, User, Group, users_to_groups
+
+# Statements per chunk whatever its size; a query per row would go over it.
+CHUNK_QUERY_BUDGET = 7
+MALFORMED_ROW = object()
+# Ends the import: a CSV reader can't resync after undecodable input.
+UNREADABLE_INPUT = object()
+
+
+def _decode(lines: Iterable) -> Iterator[str]:
+    for line in lines:
+        yield line.decode('utf-8') if isinstance(line, bytes) else line
+
+
+def parse_rows(lines: Iterable, fmt: str) -> Iterator[dict]:
+    if fmt == 'csv':
+        reader = csv.DictReader(_decode(lines))
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error:
+                yield MALFORMED_ROW
+                continue
+            except UnicodeDecodeError:
+                yield UNREADABLE_INPUT
+                return
+            yield row
+    for line in lines:
+        try:
+            line = line.decode('utf-8') if isinstance(line, bytes) else line
+        except UnicodeDecodeError:
+            yield MALFORMED_ROW
+            continue
+        if line.strip() == '':
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row if isinstance(row, dict) else MALFORMED_ROW
+
+
+def _text(row: dict, key: str) -> Optional[str]:
+    value = row.get(key, None)
+    if value is None or isinstance(value, str):
+        return value
+    # JSON numbers are fine as text; objects, lists and booleans are not.
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise DataValidationError(f'{key.capitalize()} must be a string.')
+
+
+def _import_chunk(chunk: list, seen: Set[str], default_group_id) -> Iterator[dict]:
+    valid = []
+    for number, row in chunk:
+        if row is MALFORMED_ROW:
+            yield {'row': number, 'username': None, 'error': 'Malformed row.'}
+            continue
+        if row is UNREADABLE_INPUT:
+            yield {'row': number, 'username': None, 'error': 'Input is not valid UTF-8, import stopped.'}
+            continue
+        username = None
+        try:
+            username = _text(row, 'username')
+            password = _text(row, 'password')
+            name = _text(row, 'name') or username
+            validate_username(username, check_exists=False)
+            validate_password(password)
+            validate_name(name)
+            if username in seen:
+                raise DataValidationError('Duplicate username in import.')
+        except DataValidationError as e:
+            yield {'row': number, 'username': username, **e.response}
+            continue
+        seen.add(username)
+        valid.append((number, username, password, name))
+
+    existing = {
+        row.username for row in db.session.query(User.username)
+        .filter(User.username.in_([username for _, username, _, _ in valid]))
+    }
+    for number, username, _, _ in valid:
+        if username in existing:
+            yield {'row': number, 'username': username, 'error': 'Username already exists.'}
+    valid = [row for row in valid if row[1] not in existing]
+    if not valid:
+        return
+
+    hashes = password_hasher.hash_many([password for _, _, password, _ in valid])
+    users = [
+        {'id': generate_uuid(), 'active': False, 'username': username, 'name': name, 'password_hash': password_hash}
+        for (_, username, _, name), password_hash in zip(valid, hashes)
+    ]
+    try:
+        db.session.execute(insert(User.__table__), users)
+        if default_group_id is not None:
+            db.session.execute(
+                insert(users_to_groups),
+                [{'group_id': default_group_id, 'user_id': user['id']} for user in users]
+            )
+            bump_versions(Group, [default_group_id])
+        bump_generation(USERS_GENERATION)
+        groups = [default_group_id] if default_group_id is not None else []
+        change_feed.record_many('user', 'create', [
+            {'id': user['id'], 'active': user['active'], 'username': user['username'], 'name': user['name'],
+             'groups': groups}
+            for user in users
+        ])
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        for number, username, _, _ in valid:
+            yield {'row': number, 'username': username, 'error': 'Username already exists.'}
+        return
+    yield {'imported': len(users)}
+
+
+def import_users(rows: Iterable[dict], chunk_size: int) -> Iterator[dict]:
+    default_group_id = db.session.query(Group.id).filter_by(name='users').scalar()
+    # Only usernames are kept across chunks, to catch duplicates within the file.
+    seen: Set[str] = set()
+    numbered = enumerate(rows, 1)
+    imported, failed = 0, 0
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            break
+        # Streamed after the view's own budget is gone, so each chunk carries one.
+        with QueryBudget(CHUNK_QUERY_BUDGET, 'import_users chunk'):
+            entries = list(_import_chunk(chunk, seen, default_group_id))
+        for entry in entries:
+            if 'imported' in entry:
+                imported += entry['imported']
+                continue
+            failed += 1
+            yield entry
+    yield {'imported': imported, 'failed': failed}
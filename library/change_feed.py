@@ -0,0 +1,96 @@
+import time
+from threading import Condition
+from typing import Iterable, List, Optional
+from sqlalchemy import event, func, insert
+from iam.library.authz_version import bump_generation, generation_value
+from iam.library.validate import DataValidationError
+from iam.models import db, ChangeLog, Generation
+
+CHANGES_GENERATION = 'changes'
+# Highest change id removed by compaction; cursors below it can't be resumed.
+COMPACTED_GENERATION = 'changes_compacted'
+
+
+class ChangeFeed:
+    # Long-polls and streams in this process wake up as soon as a change commits;
+    # changes committed by other workers are picked up on the next poll.
+    def __init__(self):
+        self._condition = Condition()
+        self._sequence = 0
+
+    @property
+    def sequence(self) -> int:
+        return self._sequence
+
+    def _serialize_writers(self):
+        # Writers queue on this row before taking a change id, so ids become visible
+        # in order and a consumer never skips past a transaction that commits late.
+        bump_generation(CHANGES_GENERATION)
+        db.session.info['iam_changes'] = True
+
+    def record(self, entity: str, entity_id: str, action: str, data: Optional[dict] = None):
+        self._serialize_writers()
+        db.session.add(ChangeLog(
+            entity=entity, entity_id=entity_id, action=action, data=data, created_at=time.time()
+        ))
+
+    def record_many(self, entity: str, action: str, entries: Iterable[dict]):
+        self._serialize_writers()
+        now = time.time()
+        db.session.execute(insert(ChangeLog.__table__), [
+            {'entity': entity, 'entity_id': data['id'], 'action': action, 'data': data, 'created_at': now}
+            for data in entries
+        ])
+
+    def after_commit(self, session):
+        if session.info.pop('iam_changes', False):
+            with self._condition:
+                self._sequence += 1
+                self._condition.notify_all()
+
+    def after_rollback(self, session):
+        session.info.pop('iam_changes', None)
+
+    def wait(self, seen: int, timeout: float):
+        with self._condition:
+            if self._sequence == seen:
+                self._condition.wait(timeout)
+
+
+def check_cursor(since: int):
+    if since < generation_value(COMPACTED_GENERATION):
+        raise DataValidationError('Cursor is older than the change log retention, reload and start over.', 410)
+
+
+def latest_cursor() -> int:
+    latest = db.session.query(func.max(ChangeLog.id)).scalar()
+    return latest if latest is not None else generation_value(COMPACTED_GENERATION)
+
+
+def fetch_changes(since: int, entities: List[str], limit: int) -> List[dict]:
+    rows = db.session.query(
+        ChangeLog.id, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.action, ChangeLog.data, ChangeLog.created_at
+    ).filter(ChangeLog.id > since, ChangeLog.entity.in_(entities)).order_by(ChangeLog.id).limit(limit).all()
+    return [
+        {'id': id, 'entity': entity, 'entity_id': entity_id, 'action': action, 'data': data, 'at': created_at}
+        for id, entity, entity_id, action, data, created_at in rows
+    ]
+
+
+def compact_changes(retention: float) -> int:
+    cutoff = time.time() - retention
+    last = db.session.query(func.max(ChangeLog.id)).filter(ChangeLog.created_at < cutoff).scalar()
+    if last is None:
+        return 0
+    deleted = ChangeLog.query.filter(ChangeLog.id <= last).delete(synchronize_session=False)
+    updated = Generation.query.filter_by(name=COMPACTED_GENERATION) \
+        .update({Generation.value: last}, synchronize_session=False)
+    if updated == 0:
+        db.session.add(Generation(name=COMPACTED_GENERATION, value=last))
+    db.session.commit()
+    return deleted
+
+
+change_feed = ChangeFeed()
+event.listen(db.session, 'after_commit', change_feed.after_commit)
+event.listen(db.session, 'after_rollback', change_feed.after_rollback)
@@ -0,0 +1,23 @@
+from flask import current_app, make_response, request
+
+
+def make_etag(*parts) -> str:
+    return '-'.join(str(part) for part in parts)
+
+
+def not_modified(etag: str):
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def with_etag(rv, etag: str):
+    response = make_response(rv)
+    if response.status_code == 200:
+        response.set_etag(etag)
+        # Clients may keep the body but must revalidate it before every use.
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    return response
@@ -0,0 +1,67 @@
+from flask import Flask, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from iam.models import db
+
+WRITE_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+
+def apply_engine_profile(app: Flask):
+    config = app.config
+    options = config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    if make_url(config['SQLALCHEMY_DATABASE_URI']).get_backend_name() == 'sqlite':
+        return
+    options.setdefault('pool_size', config['DB_POOL_SIZE'])
+    options.setdefault('max_overflow', config['DB_MAX_OVERFLOW'])
+    options.setdefault('pool_pre_ping', config['DB_POOL_PRE_PING'])
+    options.setdefault('pool_recycle', config['DB_POOL_RECYCLE'])
+
+
+def _sqlite_pragmas(config) -> dict:
+    return {
+        'journal_mode': config['SQLITE_JOURNAL_MODE'],
+        'synchronous': config['SQLITE_SYNCHRONOUS'],
+        'busy_timeout': config['SQLITE_BUSY_TIMEOUT'],
+        'mmap_size': config['SQLITE_MMAP_SIZE'],
+        'cache_size': config['SQLITE_CACHE_SIZE'],
+    }
+
+
+def install_engine_events(app: Flask):
+    with app.app_context():
+        engine = db.engine
+
+    if engine.dialect.name != 'sqlite':
+        options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+        app.logger.info(
+            'Database engine %s: pool_size=%s max_overflow=%s pool_pre_ping=%s pool_recycle=%s',
+            engine.dialect.name, engine.pool.size(), options.get('max_overflow'),
+            options.get('pool_pre_ping'), options.get('pool_recycle')
+        )
+        return
+
+    pragmas = _sqlite_pragmas(app.config)
+    immediate_writes = app.config['SQLITE_IMMEDIATE_WRITES']
+    deferred_endpoints = set(app.config['SQLITE_DEFERRED_ENDPOINTS'])
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        # Take over transaction control from pysqlite so 'begin' below decides how to BEGIN.
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def begin(connection):
+        # A deferred transaction that reads and then writes fails with SQLITE_BUSY
+        # instead of waiting when another writer got there first, busy_timeout or not.
+        immediate = immediate_writes and has_request_context() \
+            and request.method in WRITE_METHODS and request.endpoint not in deferred_endpoints
+        connection.exec_driver_sql('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+
+    app.logger.info(
+        'Database engine sqlite: %s immediate_writes=%s',
+        ' '.join(f'{name}={value}' for name, value in pragmas.items()), immediate_writes
+    )
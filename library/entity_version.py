@@ -0,0 +1,42 @@
+from sqlalchemy import select
+from iam.models import Group, Permission, users_to_groups, group_to_permissions, group_to_groups
+
+# A group's detail view embeds its users, permissions and subgroups, a permission's embeds
+# its groups, so their versions also move when a member is added, removed or renamed.
+
+
+def bump_versions(model, ids):
+    model.query.filter(model.id.in_(ids)) \
+        .update({model.version: model.version + 1}, synchronize_session=False)
+
+
+def groups_of_user(user_id: str):
+    return select(users_to_groups.c.group_id).where(users_to_groups.c.user_id == user_id)
+
+
+def groups_of_permission(permission_id: str):
+    return select(group_to_permissions.c.group_id).where(group_to_permissions.c.permission_id == permission_id)
+
+
+def permissions_of_group(group_id: str):
+    return select(group_to_permissions.c.permission_id).where(group_to_permissions.c.group_id == group_id)
+
+
+def parents_of_group(group_id: str):
+    return select(group_to_groups.c.parent_id).where(group_to_groups.c.child_id == group_id)
+
+
+def bump_user_groups(user_id: str):
+    bump_versions(Group, groups_of_user(user_id))
+
+
+def bump_permission_groups(permission_id: str):
+    bump_versions(Group, groups_of_permission(permission_id))
+
+
+def bump_group_permissions(group_id: str):
+    bump_versions(Permission, permissions_of_group(group_id))
+
+
+def bump_group_parents(group_id: str):
+    bump_versions(Group, parents_of_group(group_id))
@@ -0,0 +1,66 @@
+import csv
+import io
+from collections import defaultdict
+from typing import Iterator
+from flask import current_app
+from iam.library.authz_version import global_version_column
+from iam.library.query_budget import QueryBudget
+from iam.models import User, group_closure, users_to_groups, effective_memberships, rbac_snapshot
+
+CSV_COLUMNS = ['id', 'active', 'username', 'name', 'groups', 'effective_groups', 'permissions']
+LIST_COLUMNS = ('groups', 'effective_groups', 'permissions')
+# Per batch: the users, their memberships and the graph snapshot when it is stale.
+BATCH_QUERY_BUDGET = 3
+
+
+def _batch_rights(user_ids: list) -> dict:
+    rows = effective_memberships(
+        users_to_groups.c.user_id, users_to_groups.c.group_id, group_closure.c.ancestor_id, global_version_column()
+    ).filter(users_to_groups.c.user_id.in_(user_ids)).all()
+    rights = defaultdict(lambda: dict.fromkeys(LIST_COLUMNS, []))
+    if not rows:
+        return rights
+    memberships = defaultdict(lambda: ([], []))
+    for user_id, direct_id, group_id, _ in rows:
+        memberships[user_id][0].append(group_id)
+        memberships[user_id][1].append(direct_id)
+    snapshot = rbac_snapshot(rows[0][3])
+    for user_id, (group_ids, direct_ids) in memberships.items():
+        rights[user_id] = dict(zip(LIST_COLUMNS, map(list, snapshot.resolve(group_ids, direct_ids))))
+    return rights
+
+
+def export_users(batch_size: int) -> Iterator[dict]:
+    last_id = None
+    while True:
+        with QueryBudget(BATCH_QUERY_BUDGET, 'export_users batch'):
+            query = User.short_query()
+            if last_id is not None:
+                query = query.filter(User.id > last_id)
+            users = query.order_by(User.id).limit(batch_size).all()
+            if not users:
+                return
+            rights = _batch_rights([user.id for user in users])
+
+        for row in User.short_rows(users):
+            row.update(rights[row['id']])
+            yield row
+        last_id = users[-1].id
+
+
+def format_rows(rows: Iterator[dict], fmt: str) -> Iterator[str]:
+    if fmt != 'csv':
+        for row in rows:
+            yield current_app.json.dumps(row) + '\n'
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, CSV_COLUMNS)
+    writer.writeheader()
+    for row in rows:
+        # Names may contain any separator; a JSON array per cell stays unambiguous.
+        writer.writerow({**row, **{column: current_app.json.dumps(row[column]) for column in LIST_COLUMNS}})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,121 @@
+from collections import defaultdict, deque
+from typing import Iterable, List
+from sqlalchemy import delete, exists, func, insert, or_, select, true, update
+from iam.library.validate import DataValidationError
+from iam.models import db, Group, group_closure, group_to_groups
+
+
+def ancestor_ids(group_id: str) -> List[str]:
+    return [
+        row.ancestor_id for row in db.session.query(group_closure.c.ancestor_id)
+        .filter(group_closure.c.descendant_id == group_id)
+    ]
+
+
+def _lock(group_id: str, child_ids: Iterable[str]):
+    # Locks every group the edit can connect: the group's ancestors and everything below it or
+    # below the requested children. Two edits that would close a cycle between them always share
+    # one of these rows, so the second waits and its cycle check sees the first one's edge.
+    # SQLite has no row locks, its writers are serialized anyway.
+    related = select(group_closure.c.ancestor_id).where(group_closure.c.descendant_id == group_id).union(
+        select(group_closure.c.descendant_id).where(group_closure.c.ancestor_id.in_([group_id, *child_ids]))
+    )
+    db.session.query(Group.id).filter(Group.id.in_(related)).order_by(Group.id).with_for_update().all()
+
+
+def _add_paths(group_id: str, added: Iterable[str]):
+    # New paths run from every ancestor of the group to every descendant of an added child.
+    above, below = group_closure.alias('above'), group_closure.alias('below')
+    depth = func.min(above.c.depth + 1 + below.c.depth)
+    paths = (above.c.descendant_id == group_id, below.c.ancestor_id.in_(list(added)))
+    # Pairs already connected keep their row, with the depth shortened if the new path is shorter.
+    shorter = select(depth).where(
+        *paths,
+        above.c.ancestor_id == group_closure.c.ancestor_id,
+        below.c.descendant_id == group_closure.c.descendant_id
+    ).scalar_subquery()
+    db.session.execute(update(group_closure).where(
+        group_closure.c.ancestor_id.in_(select(above.c.ancestor_id).where(above.c.descendant_id == group_id)),
+        group_closure.c.depth > shorter
+    ).values(depth=shorter))
+    connected = exists().where(
+        group_closure.c.ancestor_id == above.c.ancestor_id, group_closure.c.descendant_id == below.c.descendant_id
+    )
+    db.session.execute(insert(group_closure).from_select(
+        ['ancestor_id', 'descendant_id', 'depth'],
+        select(above.c.ancestor_id, below.c.descendant_id, depth).select_from(above.join(below, true()))
+        .where(*paths, ~connected).group_by(above.c.ancestor_id, below.c.descendant_id)
+    ))
+
+
+def _rebuild(ancestors: List[str]):
+    # Paths can meet again below an edited group, so removed pairs can't be worked
+    # out edge by edge; the affected ancestors' rows are recomputed from the edges instead.
+    if not ancestors:
+        return
+    children = defaultdict(list)
+    for parent_id, child_id in db.session.query(group_to_groups.c.parent_id, group_to_groups.c.child_id):
+        children[parent_id].append(child_id)
+
+    rows = []
+    for ancestor in ancestors:
+        depths, queue = {ancestor: 0}, deque([ancestor])
+        while queue:
+            group_id = queue.popleft()
+            for child_id in children[group_id]:
+                if child_id not in depths:
+                    depths[child_id] = depths[group_id] + 1
+                    queue.append(child_id)
+        rows += [
+            {'ancestor_id': ancestor, 'descendant_id': descendant, 'depth': depth}
+            for descendant, depth in depths.items() if depth > 0
+        ]
+
+    db.session.execute(
+        delete(group_closure).where(group_closure.c.ancestor_id.in_(ancestors), group_closure.c.depth > 0)
+    )
+    if rows:
+        db.session.execute(insert(group_closure), rows)
+
+
+def set_subgroups(group_id: str, child_ids: Iterable[str]) -> bool:
+    child_ids = set(child_ids)
+    _lock(group_id, child_ids)
+    current = {
+        row.child_id for row in db.session.query(group_to_groups.c.child_id)
+        .filter(group_to_groups.c.parent_id == group_id)
+    }
+    added, removed = child_ids - current, current - child_ids
+    if not added and not removed:
+        return False
+
+    # A group is its own descendant at depth 0, so this also refuses a group containing itself.
+    if added and db.session.query(group_closure.c.ancestor_id).filter(
+            group_closure.c.ancestor_id.in_(added), group_closure.c.descendant_id == group_id
+    ).first() is not None:
+        raise DataValidationError('A group can\'t contain itself or any group it belongs to.')
+
+    if removed:
+        db.session.execute(delete(group_to_groups).where(
+            group_to_groups.c.parent_id == group_id, group_to_groups.c.child_id.in_(removed)
+        ))
+    if added:
+        db.session.execute(insert(group_to_groups), [
+            {'parent_id': group_id, 'child_id': child_id} for child_id in added
+        ])
+    if removed:
+        _rebuild(ancestor_ids(group_id))
+    else:
+        _add_paths(group_id, added)
+    return True
+
+
+def remove_group(group_id: str):
+    ancestors = [ancestor for ancestor in ancestor_ids(group_id) if ancestor != group_id]
+    db.session.execute(delete(group_to_groups).where(
+        or_(group_to_groups.c.parent_id == group_id, group_to_groups.c.child_id == group_id)
+    ))
+    db.session.execute(delete(group_closure).where(
+        or_(group_closure.c.ancestor_id == group_id, group_closure.c.descendant_id == group_id)
+    ))
+    _rebuild(ancestors)
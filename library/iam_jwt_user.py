@@ -1,7 +1,10 @@
 from iam.common.jwt_user import JwtUser
+from iam.library.permission_catalog import get_catalog
 from iam.models import User
 
 
 class IamJwtUser(JwtUser):
+    catalog_loader = staticmethod(get_catalog)
+
     def get_db_obj(self) -> User:
         return User.query.filter_by(id=self.identity['id']).first()
@@ -0,0 +1,32 @@
+from typing import List, Optional, Tuple
+from iam.library.authz_version import global_version_column
+from iam.library.permission_cache import permission_cache
+from iam.models import db, User, group_closure, users_to_groups, rbac_snapshot
+
+
+def load_identity(**filters) -> Tuple[Optional[User], Optional[dict], Optional[List[int]]]:
+    # One row per group; names and permissions come from the in-memory graph snapshot.
+    rows = db.session.query(User, users_to_groups.c.group_id, group_closure.c.ancestor_id, global_version_column()) \
+        .outerjoin(users_to_groups, users_to_groups.c.user_id == User.id) \
+        .outerjoin(group_closure, group_closure.c.descendant_id == users_to_groups.c.group_id) \
+        .filter(*[getattr(User, key) == value for key, value in filters.items()]) \
+        .all()
+    if not rows:
+        return None, None, None
+
+    user, global_version = rows[0][0], rows[0][3]
+    memberships = [(direct_id, group_id) for row_user, direct_id, group_id, _ in rows
+                   if row_user is user and group_id is not None]
+    rights = ((), (), ())
+    if memberships:
+        rights = rbac_snapshot(global_version).resolve(
+            [group_id for _, group_id in memberships], [direct_id for direct_id, _ in memberships]
+        )
+    versions = [user.authz_version, global_version or 0]
+    permission_cache.set(user.id, rights, versions)
+    return user, {
+        **user.short,
+        'groups': list(rights[0]),
+        'effective_groups': list(rights[1]),
+        'permissions': list(rights[2])
+    }, versions
@@ -0,0 +1,39 @@
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    # Fall back to DefaultJSONProvider for dates, decimals, dataclasses and __html__ so output matches it.
+    PASSTHROUGH = 0 if orjson is None else orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+    def dumps(self, obj, **kwargs) -> str:
+        option = self.PASSTHROUGH | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent', None) == 2:
+            kwargs.pop('indent')
+            option |= orjson.OPT_INDENT_2
+        elif kwargs.get('separators', None) == (',', ':'):
+            kwargs.pop('separators')
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+def json_provider(app: Flask) -> JSONProvider:
+    backend = app.config['JSON_PROVIDER']
+    if backend == 'orjson' and orjson is None:
+        raise RuntimeError('JSON_PROVIDER is orjson but orjson is not installed.')
+    if backend in ('auto', 'orjson') and orjson is not None:
+        return OrjsonProvider(app)
+    return DefaultJSONProvider(app)
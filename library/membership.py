@@ -0,0 +1,92 @@
+from typing import NamedTuple
+from flask import current_app, jsonify, request
+from sqlalchemy import Column, func
+from iam.library.pagination import encode_cursor, keyset_paginate
+from iam.library.search import search_clause
+from iam.library.validate import DataValidationError
+from iam.models import db, User, Group, Permission, users_to_groups, group_to_permissions, group_to_groups
+
+
+class Members(NamedTuple):
+    model: type
+    query: object
+    # The association column holding the member id. Ordering by it walks the
+    # association table's index instead of sorting every member.
+    key: Column
+    owner: Column
+    owner_id: str
+
+    def count(self) -> int:
+        return db.session.query(func.count()).select_from(self.owner.table).filter(self.owner == self.owner_id).scalar()
+
+
+def group_users(group_id: str) -> Members:
+    query = User.short_query() \
+        .join(users_to_groups, users_to_groups.c.user_id == User.id) \
+        .filter(users_to_groups.c.group_id == group_id)
+    return Members(User, query, users_to_groups.c.user_id, users_to_groups.c.group_id, group_id)
+
+
+def group_permissions(group_id: str) -> Members:
+    query = Permission.short_query() \
+        .join(group_to_permissions, group_to_permissions.c.permission_id == Permission.id) \
+        .filter(group_to_permissions.c.group_id == group_id)
+    return Members(Permission, query, group_to_permissions.c.permission_id, group_to_permissions.c.group_id, group_id)
+
+
+def group_subgroups(group_id: str) -> Members:
+    query = Group.short_query() \
+        .join(group_to_groups, group_to_groups.c.child_id == Group.id) \
+        .filter(group_to_groups.c.parent_id == group_id)
+    return Members(Group, query, group_to_groups.c.child_id, group_to_groups.c.parent_id, group_id)
+
+
+def permission_groups(permission_id: str) -> Members:
+    query = Group.short_query() \
+        .join(group_to_permissions, group_to_permissions.c.group_id == Group.id) \
+        .filter(group_to_permissions.c.permission_id == permission_id)
+    return Members(Group, query, group_to_permissions.c.group_id, group_to_permissions.c.permission_id, permission_id)
+
+
+def _preview(name: str, members: Members) -> dict:
+    size = current_app.config['MEMBERSHIP_PREVIEW_SIZE']
+    if size < 1:
+        # Counts only; listing starts from the first page.
+        count = members.count()
+        return {name: [], f'{name}_count': count, f'{name}_next': '' if count else None}
+    rows = members.query.order_by(members.key).limit(size + 1).all()
+    next_cursor = encode_cursor(rows[size - 1].id) if len(rows) > size else None
+    return {
+        name: members.model.short_rows(rows[:size]),
+        f'{name}_count': members.count(),
+        f'{name}_next': next_cursor
+    }
+
+
+def group_detail(group: Group) -> dict:
+    return {
+        **group.short,
+        **_preview('users', group_users(group.id)),
+        **_preview('permissions', group_permissions(group.id)),
+        **_preview('groups', group_subgroups(group.id))
+    }
+
+
+def permission_detail(permission: Permission) -> dict:
+    return {
+        **permission.short,
+        **_preview('groups', permission_groups(permission.id))
+    }
+
+
+def member_list_response(members: Members):
+    query = members.query
+    search = request.args.get('search', None)
+    if search is not None and search != '':
+        query = query.filter(search_clause(members.model, search))
+    try:
+        # Counts must come from the filtered query, never from the whole table's estimate.
+        page = keyset_paginate(query, members.key, filtered=True, row_key='id')
+    except DataValidationError as e:
+        return jsonify(e.response), e.code
+    return jsonify(page.response(members.model.short_rows(page.items)))
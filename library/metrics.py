@@ -0,0 +1,153 @@
+import time
+from contextlib import contextmanager, nullcontext
+from threading import Lock
+from typing import Dict, List, Sequence, Tuple
+from flask import Flask, g, has_request_context, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_NOOP = nullcontext()
+
+
+def _label_set(pairs: List[str], **extra) -> str:
+    pairs = pairs + [f'{name}="{value}"' for name, value in extra.items()]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((labels, [list(s[0]), s[1], s[2]]) for labels, s in self._series.items())
+        for labels, (counts, total, count) in series:
+            pairs = [f'{name}="{value}"' for name, value in zip(self.labels, labels)]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_label_set(pairs, le=bound)} {cumulative}')
+            lines.append(f'{self.name}_bucket{_label_set(pairs, le="+Inf")} {count}')
+            lines.append(f'{self.name}_sum{_label_set(pairs)} {total}')
+            lines.append(f'{self.name}_count{_label_set(pairs)} {count}')
+        return lines
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.enabled = False
+        self.duration = Histogram('iam_request_duration_seconds', 'Request latency.',
+                                  ('blueprint', 'method', 'status'), LATENCY_BUCKETS)
+        self.sql_statements = Histogram('iam_request_sql_statements', 'SQL statements executed per request.',
+                                        ('blueprint',), COUNT_BUCKETS)
+        self.sql_duration = Histogram('iam_request_sql_duration_seconds', 'Time spent in SQL per request.',
+                                      ('blueprint',), LATENCY_BUCKETS)
+        self.phases = {
+            'password': Histogram('iam_request_password_seconds',
+                                  'Time spent checking passwords, per request that checked one.',
+                                  ('blueprint',), LATENCY_BUCKETS),
+            'serialization': Histogram('iam_request_serialization_seconds',
+                                       'Time spent encoding JSON responses, per request that encoded one.',
+                                       ('blueprint',), LATENCY_BUCKETS),
+        }
+
+    def init_app(self, app: Flask, engine):
+        self.enabled = app.config['METRICS_ENABLED']
+        if not self.enabled:
+            return
+
+        app.before_request(self._start)
+        app.after_request(self._record_status)
+        app.teardown_request(self._finish)
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+        dumps = app.json.dumps
+
+        def timed_dumps(obj, **kwargs):
+            with self.timed('serialization'):
+                return dumps(obj, **kwargs)
+
+        app.json.dumps = timed_dumps
+
+    def timed(self, phase: str):
+        if not self.enabled:
+            return _NOOP
+        return self._timed(phase)
+
+    @contextmanager
+    def _timed(self, phase: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            current = self._current()
+            if current is not None:
+                current[phase] = current.get(phase, 0.0) + time.perf_counter() - start
+
+    @staticmethod
+    def _current():
+        return g.get('iam_metrics', None) if has_request_context() else None
+
+    @staticmethod
+    def _start():
+        g.iam_metrics = {'start': time.perf_counter(), 'sql_statements': 0, 'sql_duration': 0.0}
+
+    def _record_status(self, response):
+        current = self._current()
+        if current is not None:
+            current['status'] = response.status_code
+        return response
+
+    def _finish(self, exc):
+        current = g.pop('iam_metrics', None)
+        if current is None:
+            return
+        blueprint = request.blueprint or ''
+        status = str(current.get('status', 500))
+        self.duration.observe((blueprint, request.method, status), time.perf_counter() - current['start'])
+        self.sql_statements.observe((blueprint,), current['sql_statements'])
+        self.sql_duration.observe((blueprint,), current['sql_duration'])
+        for phase, histogram in self.phases.items():
+            if phase in current:
+                histogram.observe((blueprint,), current[phase])
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('iam_query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['iam_query_start'].pop()
+        current = self._current()
+        if current is not None:
+            current['sql_statements'] += 1
+            current['sql_duration'] += elapsed
+
+    def render(self) -> str:
+        lines = []
+        for histogram in (self.duration, self.sql_statements, self.sql_duration, *self.phases.values()):
+            lines += histogram.render()
+        return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetrics()
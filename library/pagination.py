@@ -0,0 +1,80 @@
+import base64
+import binascii
+import json
+from typing import Optional
+from flask import current_app, request
+from sqlalchemy import func, select, text
+from iam.library.validate import DataValidationError
+from iam.models import db
+
+
+class KeysetPage:
+    def __init__(self, items: list, next: Optional[str], count: Optional[int] = None):
+        self.items = items
+        self.next = next
+        self.count = count
+
+    def response(self, data: list) -> dict:
+        result = {'error': None, 'data': data, 'next': self.next}
+        if self.count is not None:
+            result['count'] = self.count
+        return result
+
+
+def encode_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps([value]).encode()).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError, TypeError):
+        raise DataValidationError('Invalid cursor.')
+    # Only what encode_cursor produces: a one-element list around a key value.
+    if not isinstance(decoded, list) or len(decoded) != 1 or not isinstance(decoded[0], (str, int, float)):
+        raise DataValidationError('Invalid cursor.')
+    return decoded[0]
+
+
+def is_keyset_request() -> bool:
+    return 'after' in request.args
+
+
+def approximate_count(table) -> int:
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        estimate = db.session.execute(
+            text('SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)'),
+            {'name': table.name}
+        ).scalar()
+        if estimate is not None and estimate >= 0:
+            return estimate
+    elif dialect == 'sqlite':
+        return db.session.execute(select(func.coalesce(func.max(text('rowid')), 0)).select_from(table)).scalar()
+    return db.session.execute(select(func.count()).select_from(table)).scalar()
+
+
+def keyset_paginate(query, key, filtered: bool = False, row_key: Optional[str] = None) -> KeysetPage:
+    try:
+        per_page = int(request.args.get('per_page', 10))
+    except ValueError:
+        per_page = 10
+    per_page = min(max(per_page, 1), current_app.config['PAGINATION_MAX_PER_PAGE'])
+
+    count_mode = request.args.get('count', 'none')
+    count = None
+    if count_mode == 'exact' or (count_mode == 'approx' and filtered):
+        count = query.order_by(None).count()
+    elif count_mode == 'approx':
+        count = approximate_count(key.class_.__table__)
+
+    after = request.args.get('after', '')
+    if after != '':
+        query = query.filter(key > decode_cursor(after))
+
+    items = query.order_by(key).limit(per_page + 1).all()
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = encode_cursor(getattr(items[-1], row_key or key.key))
+    return KeysetPage(items, next_cursor, count)
@@ -0,0 +1,103 @@
+import os
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+from threading import BoundedSemaphore, Lock
+from typing import List, Optional
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HasherBusyError(Exception):
+    def __init__(self, msg: str = 'Too many password operations in progress, try again later.', code: int = 503):
+        self.code = code
+        self.msg = msg
+
+    @property
+    def response(self) -> dict:
+        return {'error': self.msg}
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.configure()
+
+    def configure(
+            self,
+            method: str = 'scrypt',
+            salt_length: int = 16,
+            executor: str = 'thread',
+            workers: int = 4,
+            queue_limit: int = 32,
+            timeout: float = 10
+    ):
+        self.method = method
+        self.salt_length = salt_length
+        self.executor = executor
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = BoundedSemaphore(queue_limit)
+        self._pool: Optional[Executor] = None
+        self._pool_pid = None
+        self._pool_lock = Lock()
+        self._prefix = None
+
+    def _get_pool(self) -> Executor:
+        with self._pool_lock:
+            # Pools don't survive a fork, so each gunicorn worker gets its own.
+            if self._pool is None or self._pool_pid != os.getpid():
+                pool_class = ProcessPoolExecutor if self.executor == 'process' else ThreadPoolExecutor
+                self._pool = pool_class(max_workers=self.workers)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _submit(self, fn, *args, wait: bool = False) -> Future:
+        acquired = self._slots.acquire(timeout=self.timeout) if wait else self._slots.acquire(blocking=False)
+        if not acquired:
+            raise HasherBusyError()
+        try:
+            future = self._get_pool().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _result(self, future: Future):
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise HasherBusyError()
+
+    def _run(self, fn, *args):
+        if self.executor == 'inline':
+            return fn(*args)
+        return self._result(self._submit(fn, *args))
+
+    def hash(self, password: str) -> str:
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def hash_many(self, passwords: List[str]) -> List[str]:
+        if self.executor == 'inline':
+            return [generate_password_hash(p, self.method, self.salt_length) for p in passwords]
+        # Batches go through the same slots but keep at most `workers` hashes in flight,
+        # waiting for a slot instead of failing: a login queues behind one round of
+        # import hashes, not the whole batch.
+        hashes, in_flight = [], deque()
+        for password in passwords:
+            if len(in_flight) >= self.workers:
+                hashes.append(self._result(in_flight.popleft()))
+            in_flight.append(self._submit(generate_password_hash, password, self.method, self.salt_length, wait=True))
+        while in_flight:
+            hashes.append(self._result(in_flight.popleft()))
+        return hashes
+
+    def check(self, password_hash: str, password: str) -> bool:
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        if self._prefix is None:
+            # werkzeug fills in default KDF parameters, e.g. 'scrypt' -> 'scrypt:32768:8:1'.
+            self._prefix = generate_password_hash('', self.method, 1).split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._prefix
+
+
+password_hasher = PasswordHasher()
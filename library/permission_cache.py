@@ -0,0 +1,61 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Sequence, Tuple
+
+# (group names, effective group names, permission names)
+Rights = Tuple[tuple, tuple, tuple]
+
+
+class PermissionCache:
+    def __init__(self, max_size: int = 10000, ttl: float = 300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = Lock()
+
+    def configure(self, max_size: int, ttl: float):
+        with self._lock:
+            self.max_size = max_size
+            self.ttl = ttl
+            self._data.clear()
+
+    def get(self, user_id: str, versions: Optional[Sequence[int]] = None) -> Optional[Rights]:
+        # With `versions`, an entry stamped with other versions is a miss: another worker's
+        # write moved them without invalidating this process's copy.
+        with self._lock:
+            item = self._data.get(user_id)
+            if item is None:
+                return None
+            expires, stamp, value = item
+            if expires < time.monotonic() or versions is not None and stamp != tuple(versions):
+                del self._data[user_id]
+                return None
+            self._data.move_to_end(user_id)
+            return value
+
+    def set(self, user_id: str, value: Rights, versions: Optional[Sequence[int]] = None):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            stamp = tuple(versions) if versions is not None else None
+            self._data[user_id] = (time.monotonic() + self.ttl, stamp, value)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, *user_ids: str):
+        with self._lock:
+            for user_id in user_ids:
+                self._data.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Per-process cache of (group names, effective group names, permission names) by user id,
+# stamped with the [authz_version, authz generation] they were loaded at. Write routes
+# invalidate it after commit; readers that know the current versions skip stale entries,
+# the TTL bounds staleness for the rest.
+permission_cache = PermissionCache()
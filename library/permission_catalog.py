@@ -0,0 +1,94 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Iterable, Optional
+from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from iam.common.permission_catalog import PermissionCatalog
+from iam.models import db, Permission, PermissionCatalogVersion
+
+_lock = Lock()
+_catalogs: OrderedDict = OrderedDict()
+_current: Optional[PermissionCatalog] = None
+_built_at = 0.0
+_history_size = 16
+
+
+def _remember(catalog: PermissionCatalog):
+    with _lock:
+        _catalogs[catalog.version] = catalog
+        _catalogs.move_to_end(catalog.version)
+        while len(_catalogs) > _history_size:
+            _catalogs.popitem(last=False)
+
+
+def _persist(catalog: PermissionCatalog):
+    # Own transaction: the catalog has to be stored before any token naming it goes out,
+    # whatever the request's session does next. Versions are content hashes, so another
+    # worker storing the same one first is fine.
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(insert(PermissionCatalogVersion.__table__).values(
+                version=catalog.version, names=list(catalog.names), created_at=time.time()
+            ))
+    except IntegrityError:
+        pass
+
+
+def current_catalog(required: Iterable[str] = ()) -> PermissionCatalog:
+    # `required` names must be in the catalog: one created by another worker rebuilds it before the TTL is up.
+    global _current, _built_at
+    with _lock:
+        if _current is not None and time.monotonic() - _built_at < current_app.config['PERMISSION_CATALOG_TTL'] \
+                and not _current.missing(required):
+            return _current
+    catalog = PermissionCatalog(row.name for row in db.session.query(Permission.name))
+    with _lock:
+        known = catalog.version in _catalogs
+    if not known:
+        _persist(catalog)
+    _remember(catalog)
+    with _lock:
+        _current, _built_at = catalog, time.monotonic()
+    return catalog
+
+
+def get_catalog(version: str) -> Optional[PermissionCatalog]:
+    with _lock:
+        catalog = _catalogs.get(version)
+    if catalog is not None:
+        return catalog
+    # Issued by another worker or before a restart; a miss leaves the current catalog alone.
+    names = db.session.query(PermissionCatalogVersion.names).filter_by(version=version).scalar()
+    if names is None:
+        return None
+    catalog = PermissionCatalog(names)
+    _remember(catalog)
+    return catalog
+
+
+def reset_catalog():
+    global _current
+    with _lock:
+        _current = None
+
+
+def clear_catalogs():
+    global _current
+    with _lock:
+        _current = None
+        _catalogs.clear()
+
+
+def token_identity(identity: dict) -> dict:
+    if not current_app.config['JWT_COMPACT_PERMISSIONS']:
+        return identity
+    catalog = current_catalog(identity['permissions'])
+    if catalog.missing(identity['permissions']):
+        # Deleted since the identity was loaded; the full list is still correct, just longer.
+        return identity
+    compact = {key: value for key, value in identity.items() if key != 'permissions'}
+    compact['perm_catalog'] = catalog.version
+    compact['perm_bits'] = catalog.encode(identity['permissions'])
+    return compact
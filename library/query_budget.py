@@ -0,0 +1,110 @@
+import os
+import traceback
+import warnings
+from contextvars import ContextVar
+from functools import wraps
+from typing import List, Optional, Tuple
+from flask import Flask, current_app, has_app_context
+from sqlalchemy import event
+
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_active: ContextVar[Tuple['QueryBudget', ...]] = ContextVar('iam_query_budgets', default=())
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryBudgetWarning(UserWarning):
+    pass
+
+
+def _origin() -> str:
+    # The innermost frame inside the iam package, else the innermost one outside installed libraries.
+    frames = [
+        frame for frame in reversed(traceback.extract_stack())
+        if frame.filename != __file__ and 'site-packages' not in frame.filename
+    ]
+    frame = next((f for f in frames if f.filename.startswith(_PACKAGE_DIR)), frames[0] if frames else None)
+    if frame is None:
+        return '<unknown>'
+    return f'{os.path.relpath(frame.filename, _PACKAGE_DIR)}:{frame.lineno} in {frame.name}'
+
+
+class QueryBudget:
+    def __init__(self, max_statements: int, name: Optional[str] = None):
+        self.max_statements = max_statements
+        self.name = name
+        self.count = 0
+        self.over_budget: List[Tuple[str, str]] = []
+
+    def record(self, statement: str):
+        self.count += 1
+        if self.count > self.max_statements:
+            # Origins are only collected past the budget, the common path stays cheap.
+            self.over_budget.append((statement, _origin()))
+
+    def __enter__(self):
+        self.count = 0
+        self.over_budget = []
+        self._token = _active.set(_active.get() + (self,))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _active.reset(self._token)
+        if self.count > self.max_statements and exc_type is None:
+            query_budgets.report(self)
+
+    def __call__(self, fn):
+        name = self.name or fn.__qualname__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with QueryBudget(self.max_statements, name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    @property
+    def message(self) -> str:
+        lines = [f'{self.name or "block"} executed {self.count} SQL statements, budget is {self.max_statements}.']
+        for statement, origin in self.over_budget:
+            lines.append(f'  {origin}: {" ".join(statement.split())[:200]}')
+        return '\n'.join(lines)
+
+
+class QueryBudgets:
+    def __init__(self):
+        self.mode = 'off'
+
+    def init_app(self, app: Flask, engine):
+        mode = app.config['QUERY_BUDGET_MODE']
+        if mode is None:
+            mode = 'raise' if app.testing else 'warn' if app.debug else 'log'
+        self.mode = mode
+        if mode != 'off':
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # Explicit BEGINs only exist on SQLite (see library/engine.py); budgets shouldn't depend on the backend.
+        if statement.startswith('BEGIN'):
+            return
+        for budget in _active.get():
+            budget.record(statement)
+
+    def report(self, budget: QueryBudget):
+        if self.mode == 'raise':
+            raise QueryBudgetExceeded(budget.message)
+        if self.mode == 'warn':
+            warnings.warn(budget.message, QueryBudgetWarning, stacklevel=3)
+        elif self.mode == 'log' and has_app_context():
+            current_app.logger.warning(budget.message)
+
+
+def query_budget(max_statements: int, name: Optional[str] = None) -> QueryBudget:
+    return QueryBudget(max_statements, name)
+
+
+query_budgets = QueryBudgets()
@@ -0,0 +1,96 @@
+from threading import Lock
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from iam.common.permission_matcher import PermissionMatcher
+from iam.library.permission_cache import Rights
+
+MAX_CACHED_MASKS = 4096
+
+
+class RbacSnapshot:
+    # Immutable copy of the group -> permission graph. Every group's permissions are an
+    # int bitset over `permission_names`, so a user's rights are an OR over their groups.
+    def __init__(self, version: int, rows: Iterable[Tuple[str, str, Optional[str]]]):
+        self.version = version
+        self.group_names: Dict[str, str] = {}
+        grants = []
+        for group_id, group_name, permission_name in rows:
+            self.group_names[group_id] = group_name
+            if permission_name is not None:
+                grants.append((group_id, permission_name))
+
+        self.permission_names = tuple(sorted({name for _, name in grants}))
+        self.permission_index = {name: i for i, name in enumerate(self.permission_names)}
+        self.group_bits: Dict[str, int] = dict.fromkeys(self.group_names, 0)
+        for group_id, name in grants:
+            self.group_bits[group_id] |= 1 << self.permission_index[name]
+        # Users mostly share a handful of group combinations; decode each union once.
+        self._decoded: Dict[int, Tuple[str, ...]] = {}
+        self._matcher: Optional[PermissionMatcher] = None
+        self._masks: Dict[str, int] = {}
+
+    def bits(self, group_ids: Iterable[str]) -> int:
+        bits = 0
+        for group_id in group_ids:
+            bits |= self.group_bits.get(group_id, 0)
+        return bits
+
+    def permissions(self, bits: int) -> Tuple[str, ...]:
+        names = self._decoded.get(bits)
+        if names is None:
+            names = tuple(name for i, name in enumerate(self.permission_names) if bits >> i & 1)
+            self._decoded[bits] = names
+        return names
+
+    def resolve(self, group_ids: Iterable[str], direct_ids: Iterable[str] = ()) -> Rights:
+        # `group_ids` are the effective groups, `direct_ids` the memberships they were expanded from.
+        # Nested groups can reach the same ancestor more than once.
+        group_ids = [group_id for group_id in dict.fromkeys(group_ids) if group_id in self.group_names]
+        direct_ids = set(direct_ids)
+        return (
+            tuple(self.group_names[group_id] for group_id in group_ids if group_id in direct_ids),
+            tuple(self.group_names[group_id] for group_id in group_ids),
+            self.permissions(self.bits(group_ids))
+        )
+
+    def permission_mask(self, permission: str) -> int:
+        # Bits of every stored name granting `permission`: itself and any wildcard covering it.
+        mask = self._masks.get(permission)
+        if mask is None:
+            if self._matcher is None:
+                self._matcher = PermissionMatcher(self.permission_names)
+            mask = 0
+            for name in self._matcher.matching(permission):
+                mask |= 1 << self.permission_index[name]
+            # Checked names come from callers; don't let arbitrary ones pile up.
+            if len(self._masks) >= MAX_CACHED_MASKS:
+                self._masks.clear()
+            self._masks[permission] = mask
+        return mask
+
+    def has_permission(self, group_ids: Iterable[str], permission: str) -> bool:
+        return self.bits(group_ids) & self.permission_mask(permission) != 0
+
+
+class RbacGraph:
+    # Holds the current snapshot and swaps in a new one when the authz generation moves.
+    def __init__(self):
+        self._snapshot: Optional[RbacSnapshot] = None
+        self._lock = Lock()
+
+    def snapshot(self, version: int, load: Callable[[], Tuple[int, list]]) -> RbacSnapshot:
+        snapshot = self._snapshot
+        # Any difference, not just a newer version: a recreated database starts over from 0.
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = RbacSnapshot(*load())
+            return self._snapshot
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = None
+
+
+# Per-process; every group or permission write bumps the authz generation it is keyed by.
+rbac_graph = RbacGraph()
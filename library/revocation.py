@@ -0,0 +1,95 @@
+import time
+from threading import Lock
+from typing import Dict, Tuple
+from flask import current_app
+from iam.models import db, RevokedToken, TokenWatermark
+
+# Issue time in milliseconds; iat alone can't tell which side of a watermark a token
+# issued in the same second falls on.
+ISSUED_MS_CLAIM = 'iat_ms'
+# Ids are handed out before commit, so concurrent revocations can become visible out of order.
+TOKEN_ID_REREAD = 100
+
+
+class RevocationList:
+    # In-memory copy of the revoked_token and token_watermark tables. Lookups are
+    # dict hits; the tables are re-read incrementally at most once per interval.
+    def __init__(self, refresh_interval: float = 5):
+        self.refresh_interval = refresh_interval
+        self._jtis: Dict[str, float] = {}
+        self._watermarks: Dict[str, Tuple[float, float]] = {}
+        self._last_token_id = 0
+        self._last_watermark_update = 0.0
+        self._refreshed_at = None
+        self._lock = Lock()
+
+    def configure(self, refresh_interval: float):
+        with self._lock:
+            self.refresh_interval = refresh_interval
+            self._jtis.clear()
+            self._watermarks.clear()
+            self._last_token_id = 0
+            self._last_watermark_update = 0.0
+            self._refreshed_at = None
+
+    def _refresh(self):
+        now = time.time()
+        # Re-read the last ids too, for rows that committed after a higher id was seen.
+        since = self._last_token_id - TOKEN_ID_REREAD
+        for token in db.session.query(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at) \
+                .filter(RevokedToken.id > since, RevokedToken.expires_at > now):
+            self._jtis[token.jti] = token.expires_at
+            self._last_token_id = max(self._last_token_id, token.id)
+        # Re-read a few seconds back so writes from hosts with a lagging clock aren't missed.
+        since = self._last_watermark_update - 5
+        for watermark in db.session.query(TokenWatermark).filter(TokenWatermark.updated_at > since):
+            self._watermarks[watermark.user_id] = (watermark.access_not_before, watermark.refresh_not_before)
+            self._last_watermark_update = max(self._last_watermark_update, watermark.updated_at)
+        self._jtis = {jti: expires_at for jti, expires_at in self._jtis.items() if expires_at > now}
+
+    def _refresh_if_stale(self):
+        now = time.monotonic()
+        if self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval:
+            return
+        with self._lock:
+            if self._refreshed_at is None or now - self._refreshed_at >= self.refresh_interval:
+                self._refresh()
+                self._refreshed_at = now
+
+    def is_revoked(self, payload: dict) -> bool:
+        self._refresh_if_stale()
+        if payload['jti'] in self._jtis:
+            return True
+        identity = payload[current_app.config['JWT_IDENTITY_CLAIM']]
+        watermark = self._watermarks.get(identity['id'])
+        if watermark is None:
+            return False
+        not_before = watermark[1] if payload['type'] == 'refresh' else watermark[0]
+        issued_ms = payload.get(ISSUED_MS_CLAIM)
+        if issued_ms is None:
+            # iat is whole seconds: a token from the watermark's own second may predate it.
+            return payload['iat'] <= not_before
+        return issued_ms / 1000 <= not_before
+
+    def revoke_token(self, payload: dict):
+        expires_at = payload.get('exp', time.time() + 365 * 24 * 3600)
+        db.session.add(RevokedToken(jti=payload['jti'], expires_at=expires_at))
+        self._jtis[payload['jti']] = expires_at
+
+    def revoke_user_tokens(self, *user_ids: str, refresh: bool = True):
+        # Full precision; tokens compare their millisecond issue time against it (see is_revoked).
+        now = time.time()
+        existing = {w.user_id: w for w in TokenWatermark.query.filter(TokenWatermark.user_id.in_(user_ids))}
+        for user_id in user_ids:
+            watermark = existing.get(user_id)
+            if watermark is None:
+                watermark = TokenWatermark(user_id=user_id, access_not_before=0, refresh_not_before=0)
+                db.session.add(watermark)
+            watermark.access_not_before = now
+            if refresh:
+                watermark.refresh_not_before = now
+            watermark.updated_at = now
+            self._watermarks[user_id] = (watermark.access_not_before, watermark.refresh_not_before)
+
+
+revocation_list = RevocationList()
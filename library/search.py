@@ -0,0 +1,46 @@
+from flask import current_app
+from sqlalchemy import or_, text
+from iam.models import db
+
+# Searchable columns per table and the SQLite FTS5 trigram table that indexes them.
+SEARCH_INDEXES = {
+    'user': ('user_search', ('username', 'name')),
+    'group': ('group_search', ('name',)),
+    'permission': ('permission_search', ('name',)),
+}
+
+# Trigram indexes can't answer queries shorter than one trigram.
+MIN_INDEXED_LENGTH = 3
+
+_fts_tables = {}
+
+
+def _has_fts_table(name: str) -> bool:
+    if name not in _fts_tables:
+        _fts_tables[name] = db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': name}
+        ).first() is not None
+    return _fts_tables[name]
+
+
+def _like_pattern(term: str) -> str:
+    return '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def search_clause(model, term: str):
+    table = model.__table__.name
+    fts_table, columns = SEARCH_INDEXES[table]
+    use_fts = current_app.config['SEARCH_BACKEND'] != 'like' \
+        and db.engine.dialect.name == 'sqlite' \
+        and len(term) >= MIN_INDEXED_LENGTH \
+        and _has_fts_table(fts_table)
+
+    if use_fts:
+        return text(
+            f'"{table}".rowid IN (SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH :search_phrase)'
+        ).bindparams(search_phrase='"' + term.replace('"', '""') + '"')
+
+    # On PostgreSQL the pg_trgm GIN indexes serve ILIKE '%term%' directly.
+    pattern = _like_pattern(term)
+    return or_(*[getattr(model, column).ilike(pattern, escape='\\') for column in columns])
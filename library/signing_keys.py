@@ -0,0 +1,52 @@
+import json
+from typing import Dict, List
+from flask import Flask
+from flask_jwt_extended import JWTManager
+from jwt.algorithms import get_default_algorithms
+from iam.common.jwks import UnknownSigningKeyError, handle_unknown_signing_key
+
+
+class SigningKeys:
+    # keys: [{'kid': ..., 'private_key': PEM}, ...]; retired keys that should
+    # still verify outstanding tokens may carry only 'public_key'.
+    def __init__(self, algorithm: str, keys: List[dict], active_kid: str):
+        self.algorithm = algorithm
+        self.active_kid = active_kid
+        implementation = get_default_algorithms()[algorithm]
+        self.private_keys: Dict[str, object] = {}
+        self.public_keys: Dict[str, object] = {}
+        for key in keys:
+            if 'private_key' in key:
+                private_key = implementation.prepare_key(key['private_key'])
+                self.private_keys[key['kid']] = private_key
+                self.public_keys[key['kid']] = private_key.public_key()
+            else:
+                self.public_keys[key['kid']] = implementation.prepare_key(key['public_key'])
+        if active_kid not in self.private_keys:
+            raise ValueError(f'No private key configured for JWT_SIGNING_KID {active_kid!r}.')
+
+        jwks = []
+        for kid, public_key in self.public_keys.items():
+            jwk = json.loads(implementation.to_jwk(public_key))
+            jwks.append({**jwk, 'kid': kid, 'alg': algorithm, 'use': 'sig'})
+        self.jwks = {'keys': jwks}
+
+    def init_app(self, app: Flask, jwt: JWTManager):
+        app.extensions['iam_signing_keys'] = self
+        jwt.encode_key_loader(lambda identity: self.private_keys[self.active_kid])
+        jwt.additional_headers_loader(lambda identity: {'kid': self.active_kid})
+        jwt.decode_key_loader(self.decode_key)
+        handle_unknown_signing_key(app)
+
+    def decode_key(self, jwt_header: dict, jwt_payload: dict):
+        key = self.public_keys.get(jwt_header.get('kid'))
+        if key is None:
+            raise UnknownSigningKeyError()
+        return key
+
+
+def configure_signing(app: Flask, jwt: JWTManager):
+    algorithm = app.config.get('JWT_ALGORITHM', 'HS256')
+    if algorithm.startswith('HS'):
+        return
+    SigningKeys(algorithm, app.config['JWT_SIGNING_KEYS'], app.config['JWT_SIGNING_KID']).init_app(app, jwt)
@@ -1,3 +1,4 @@
+from iam.common.permission_matcher import SEPARATOR, WILDCARD
 from iam.models import User, Group, Permission
 
 
@@ -11,14 +12,14 @@ class DataValidationError(BaseException):
         return {'error': self.msg}
 
 
-def validate_username(username: str):
+def validate_username(username: str, check_exists: bool = True):
     if username is None:
         raise DataValidationError('Username can\'t be null.')
     if len(username) <= 3:
         raise DataValidationError('Username must be longer than 3 symbols.')
     if len(username) > 122:
         raise DataValidationError('Username can\'t be longer than 122 symbols.')
-    if User.query.filter_by(username=username).first() is not None:
+    if check_exists and User.query.filter_by(username=username).first() is not None:
         raise DataValidationError(f'Username already exists.')
 
 
@@ -52,5 +53,10 @@ def validate_permission_name(name: str):
         raise DataValidationError('Permission name must be longer than 3 symbols.')
     if len(name) > 122:
         raise DataValidationError('Permission name can\'t be longer than 122 symbols.')
+    for segment in name.split(SEPARATOR):
+        if segment == '':
+            raise DataValidationError(f'Permission name can\'t have empty "{SEPARATOR}" segments.')
+        if WILDCARD in segment and segment != WILDCARD:
+            raise DataValidationError(f'"{WILDCARD}" must be a whole segment of a permission name.')
     if Permission.query.filter_by(name=name).first() is not None:
         raise DataValidationError(f'Permission {name} already exists.')
@@ -5,6 +5,8 @@ from flask import current_app
 
 from alembic import context
 
+from iam.library.search import SEARCH_INDEXES
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -51,6 +53,19 @@ def get_metadata():
     return target_db.metadata
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    # The search indexes (migration 5e502fb11955) are managed by hand and have no
+    # models: FTS5 tables and their shadow tables on SQLite, trigram indexes on
+    # PostgreSQL. Autogenerate must not drop them.
+    if reflected and compare_to is None:
+        if type_ == 'table' and any(
+                name == fts_table or name.startswith(f'{fts_table}_') for fts_table, _ in SEARCH_INDEXES.values()):
+            return False
+        if type_ == 'index' and name.endswith('_trgm'):
+            return False
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -65,7 +80,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -97,6 +113,7 @@ def run_migrations_online():
             connection=connection,
             target_metadata=get_metadata(),
             process_revision_directives=process_revision_directives,
+            include_object=include_object,
             **current_app.extensions['migrate'].configure_args
         )
 
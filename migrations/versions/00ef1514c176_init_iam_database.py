@@ -7,7 +7,7 @@ Create Date: 2023-07-14 22:07:31.273326
 """
 from alembic import op
 import sqlalchemy as sa
-from iam.models import Permission, Group, User
+import uuid
 from werkzeug.security import generate_password_hash
 
 
@@ -18,33 +18,97 @@ branch_labels = None
 depends_on = None
 
 
+def _create_tables():
+    # Databases bootstrapped by db.create_all() already have these tables.
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('permission'):
+        op.create_table(
+            'permission',
+            sa.Column('id', sa.String(122), nullable=False),
+            sa.Column('name', sa.String(122), nullable=True),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('name')
+        )
+    if not inspector.has_table('group'):
+        op.create_table(
+            'group',
+            sa.Column('id', sa.String(122), nullable=False),
+            sa.Column('name', sa.String(122), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('name')
+        )
+    if not inspector.has_table('user'):
+        op.create_table(
+            'user',
+            sa.Column('id', sa.String(122), nullable=False),
+            sa.Column('active', sa.Boolean(), nullable=True),
+            sa.Column('username', sa.String(122), nullable=True),
+            sa.Column('name', sa.String(122), nullable=True),
+            sa.Column('password_hash', sa.String(122), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if not inspector.has_table('users_to_groups'):
+        op.create_table(
+            'users_to_groups',
+            sa.Column('group_id', sa.String(122), sa.ForeignKey('group.id'), nullable=True),
+            sa.Column('user_id', sa.String(122), sa.ForeignKey('user.id'), nullable=True)
+        )
+    if not inspector.has_table('group_to_permissions'):
+        op.create_table(
+            'group_to_permissions',
+            sa.Column('permission_id', sa.String(122), sa.ForeignKey('permission.id'), nullable=True),
+            sa.Column('group_id', sa.String(122), sa.ForeignKey('group.id'), nullable=True)
+        )
+
+
+# Table shapes as of this revision; the live models have moved on since.
+user_table = sa.table(
+    'user',
+    sa.column('id', sa.String), sa.column('active', sa.Boolean),
+    sa.column('username', sa.String), sa.column('password_hash', sa.String)
+)
+group_table = sa.table('group', sa.column('id', sa.String), sa.column('name', sa.String))
+permission_table = sa.table(
+    'permission', sa.column('id', sa.String), sa.column('name', sa.String), sa.column('description', sa.Text)
+)
+
+
 def upgrade():
-    op.bulk_insert(User.__table__, [
+    _create_tables()
+    op.bulk_insert(user_table, [
         {
+            'id': str(uuid.uuid4()),
             'active': True,
             'username': 'admin',
             'password_hash': generate_password_hash('admin')
 
         }
     ])
-    op.bulk_insert(Group.__table__, [
+    op.bulk_insert(group_table, [
         {
+            'id': str(uuid.uuid4()),
             'name': 'users',
         },
         {
+            'id': str(uuid.uuid4()),
             'name': 'admins',
         }
     ])
-    op.bulk_insert(Permission.__table__, [
+    op.bulk_insert(permission_table, [
         {
+            'id': str(uuid.uuid4()),
             'name': 'iam_users_manage',
             'description': 'Permissions to manage users'
         },
         {
+            'id': str(uuid.uuid4()),
             'name': 'iam_group_manage',
             'description': 'Permissions to manage groups'
         },
         {
+            'id': str(uuid.uuid4()),
             'name': 'iam_permission_manage',
             'description': 'Permissions to manage groups'
         }
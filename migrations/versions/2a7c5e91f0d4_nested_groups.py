@@ -0,0 +1,54 @@
+"""nested groups
+
+Revision ID: 2a7c5e91f0d4
+Revises: 8d3f60b2c4a9
+Create Date: 2026-10-18 20:15:37.284150
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2a7c5e91f0d4'
+down_revision = '8d3f60b2c4a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases bootstrapped by db.create_all() already have these tables.
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('group_to_groups'):
+        op.create_table(
+            'group_to_groups',
+            sa.Column('parent_id', sa.String(122), sa.ForeignKey('group.id'), nullable=False),
+            sa.Column('child_id', sa.String(122), sa.ForeignKey('group.id'), nullable=False),
+            sa.PrimaryKeyConstraint('parent_id', 'child_id', name='pk_group_to_groups')
+        )
+        op.create_index('ix_group_to_groups_child_id', 'group_to_groups', ['child_id', 'parent_id'])
+
+    if not inspector.has_table('group_closure'):
+        op.create_table(
+            'group_closure',
+            sa.Column('ancestor_id', sa.String(122), sa.ForeignKey('group.id'), nullable=False),
+            sa.Column('descendant_id', sa.String(122), sa.ForeignKey('group.id'), nullable=False),
+            sa.Column('depth', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id', name='pk_group_closure')
+        )
+        op.create_index('ix_group_closure_descendant_id', 'group_closure', ['descendant_id', 'ancestor_id'])
+
+    # Existing groups have no subgroups yet: each one is only its own ancestor.
+    op.execute(
+        'insert into group_closure (ancestor_id, descendant_id, depth) '
+        'select g.id, g.id, 0 from "group" g '
+        'where not exists (select 1 from group_closure c where c.ancestor_id = g.id and c.descendant_id = g.id)'
+    )
+
+
+def downgrade():
+    op.drop_index('ix_group_closure_descendant_id', table_name='group_closure')
+    op.drop_table('group_closure')
+    op.drop_index('ix_group_to_groups_child_id', table_name='group_to_groups')
+    op.drop_table('group_to_groups')
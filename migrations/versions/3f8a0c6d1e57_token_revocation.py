@@ -0,0 +1,51 @@
+"""token revocation
+
+Revision ID: 3f8a0c6d1e57
+Revises: 9c41d7e2a8b3
+Create Date: 2026-10-18 13:41:09.118240
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f8a0c6d1e57'
+down_revision = '9c41d7e2a8b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases bootstrapped by db.create_all() already have these tables.
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('revoked_token'):
+        op.create_table(
+            'revoked_token',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('jti', sa.String(36), nullable=True),
+            sa.Column('expires_at', sa.Float(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('jti'),
+            sqlite_autoincrement=True
+        )
+        op.create_index('ix_revoked_token_expires_at', 'revoked_token', ['expires_at'])
+
+    if not inspector.has_table('token_watermark'):
+        op.create_table(
+            'token_watermark',
+            sa.Column('user_id', sa.String(122), nullable=False),
+            sa.Column('access_not_before', sa.Float(), nullable=True),
+            sa.Column('refresh_not_before', sa.Float(), nullable=True),
+            sa.Column('updated_at', sa.Float(), nullable=True),
+            sa.PrimaryKeyConstraint('user_id')
+        )
+        op.create_index('ix_token_watermark_updated_at', 'token_watermark', ['updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_token_watermark_updated_at', table_name='token_watermark')
+    op.drop_table('token_watermark')
+    op.drop_index('ix_revoked_token_expires_at', table_name='revoked_token')
+    op.drop_table('revoked_token')
@@ -0,0 +1,69 @@
+"""search index
+
+Revision ID: 5e502fb11955
+Revises: 00ef1514c176
+Create Date: 2026-10-18 10:12:44.516203
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5e502fb11955'
+down_revision = '00ef1514c176'
+branch_labels = None
+depends_on = None
+
+
+SEARCH_INDEXES = {
+    'user': ('user_search', ('username', 'name')),
+    'group': ('group_search', ('name',)),
+    'permission': ('permission_search', ('name',)),
+}
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for table, (fts_table, columns) in SEARCH_INDEXES.items():
+            cols = ', '.join(columns)
+            new_values = ', '.join(f'new.{c}' for c in columns)
+            old_values = ', '.join(f'old.{c}' for c in columns)
+            op.execute(
+                f"CREATE VIRTUAL TABLE {fts_table} USING fts5("
+                f"{cols}, content='{table}', content_rowid='rowid', tokenize='trigram')"
+            )
+            op.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+            op.execute(
+                f'CREATE TRIGGER {fts_table}_ai AFTER INSERT ON "{table}" BEGIN '
+                f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.rowid, {new_values}); END"
+            )
+            op.execute(
+                f'CREATE TRIGGER {fts_table}_ad AFTER DELETE ON "{table}" BEGIN '
+                f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.rowid, {old_values}); END"
+            )
+            op.execute(
+                f'CREATE TRIGGER {fts_table}_au AFTER UPDATE ON "{table}" BEGIN '
+                f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.rowid, {old_values}); "
+                f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.rowid, {new_values}); END"
+            )
+    elif dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for table, (_, columns) in SEARCH_INDEXES.items():
+            for column in columns:
+                op.execute(
+                    f'CREATE INDEX ix_{table}_{column}_trgm ON "{table}" USING gin ({column} gin_trgm_ops)'
+                )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for fts_table, _ in SEARCH_INDEXES.values():
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f'DROP TRIGGER IF EXISTS {fts_table}_{suffix}')
+            op.execute(f'DROP TABLE IF EXISTS {fts_table}')
+    elif dialect == 'postgresql':
+        for table, (_, columns) in SEARCH_INDEXES.items():
+            for column in columns:
+                op.execute(f'DROP INDEX IF EXISTS ix_{table}_{column}_trgm')
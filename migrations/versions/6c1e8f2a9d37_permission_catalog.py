@@ -0,0 +1,34 @@
+"""permission catalog
+
+Revision ID: 6c1e8f2a9d37
+Revises: 2a7c5e91f0d4
+Create Date: 2026-10-18 21:12:44.108325
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6c1e8f2a9d37'
+down_revision = '2a7c5e91f0d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases bootstrapped by db.create_all() already have this table.
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('permission_catalog'):
+        op.create_table(
+            'permission_catalog',
+            sa.Column('version', sa.String(12), nullable=False),
+            sa.Column('names', sa.JSON(), nullable=False),
+            sa.Column('created_at', sa.Float(), nullable=True),
+            sa.PrimaryKeyConstraint('version')
+        )
+
+
+def downgrade():
+    op.drop_table('permission_catalog')
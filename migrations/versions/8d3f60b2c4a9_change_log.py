@@ -0,0 +1,47 @@
+"""change log
+
+Revision ID: 8d3f60b2c4a9
+Revises: e41c9a7d5b26
+Create Date: 2026-10-18 18:41:09.502617
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d3f60b2c4a9'
+down_revision = 'e41c9a7d5b26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases bootstrapped by db.create_all() already have this table.
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('change_log'):
+        op.create_table(
+            'change_log',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('entity', sa.String(16), nullable=False),
+            sa.Column('entity_id', sa.String(122), nullable=False),
+            sa.Column('action', sa.String(16), nullable=False),
+            sa.Column('data', sa.JSON(), nullable=True),
+            sa.Column('created_at', sa.Float(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sqlite_autoincrement=True
+        )
+        op.create_index('ix_change_log_created_at', 'change_log', ['created_at'])
+
+    for name in ('changes', 'changes_compacted'):
+        op.execute(
+            "insert into generation (name, value) "
+            f"select '{name}', 0 where not exists (select 1 from generation where name = '{name}')"
+        )
+
+
+def downgrade():
+    op.execute("delete from generation where name in ('changes', 'changes_compacted')")
+    op.drop_index('ix_change_log_created_at', table_name='change_log')
+    op.drop_table('change_log')
@@ -0,0 +1,66 @@
+"""lookup indexes
+
+Revision ID: 9c41d7e2a8b3
+Revises: 5e502fb11955
+Create Date: 2026-10-18 11:03:27.904112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c41d7e2a8b3'
+down_revision = '5e502fb11955'
+branch_labels = None
+depends_on = None
+
+
+ASSOCIATIONS = [
+    ('users_to_groups', ('group_id', 'user_id')),
+    ('group_to_permissions', ('group_id', 'permission_id')),
+]
+
+
+def _remove_duplicates(table, columns):
+    dialect = op.get_bind().dialect.name
+    op.execute(f"delete from {table} where {' or '.join(f'{c} is null' for c in columns)}")
+    if dialect == 'sqlite':
+        op.execute(
+            f"delete from {table} where rowid not in "
+            f"(select min(rowid) from {table} group by {', '.join(columns)})"
+        )
+    elif dialect == 'postgresql':
+        op.execute(
+            f"delete from {table} a using {table} b where a.ctid < b.ctid and "
+            + ' and '.join(f'a.{c} = b.{c}' for c in columns)
+        )
+
+
+def upgrade():
+    # Databases bootstrapped by db.create_all() already have these from the models.
+    inspector = sa.inspect(op.get_bind())
+
+    if 'ix_user_username' not in {i['name'] for i in inspector.get_indexes('user')}:
+        op.create_index('ix_user_username', 'user', ['username'], unique=True)
+
+    for table, (first, second) in ASSOCIATIONS:
+        if not inspector.get_pk_constraint(table)['constrained_columns']:
+            _remove_duplicates(table, (first, second))
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.alter_column(first, existing_type=sa.String(122), nullable=False)
+                batch_op.alter_column(second, existing_type=sa.String(122), nullable=False)
+                batch_op.create_primary_key(f'pk_{table}', [first, second])
+        if f'ix_{table}_{second}' not in {i['name'] for i in inspector.get_indexes(table)}:
+            op.create_index(f'ix_{table}_{second}', table, [second, first])
+
+
+def downgrade():
+    for table, (first, second) in ASSOCIATIONS:
+        op.drop_index(f'ix_{table}_{second}', table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_constraint(f'pk_{table}', type_='primary')
+            batch_op.alter_column(first, existing_type=sa.String(122), nullable=True)
+            batch_op.alter_column(second, existing_type=sa.String(122), nullable=True)
+
+    op.drop_index('ix_user_username', table_name='user')
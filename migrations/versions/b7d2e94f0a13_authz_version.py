@@ -0,0 +1,42 @@
+"""authz version
+
+Revision ID: b7d2e94f0a13
+Revises: 3f8a0c6d1e57
+Create Date: 2026-10-18 14:26:52.730491
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e94f0a13'
+down_revision = '3f8a0c6d1e57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases bootstrapped by db.create_all() already have these.
+    inspector = sa.inspect(op.get_bind())
+
+    if 'authz_version' not in {c['name'] for c in inspector.get_columns('user')}:
+        op.add_column('user', sa.Column('authz_version', sa.Integer(), server_default='0', nullable=False))
+
+    if not inspector.has_table('generation'):
+        op.create_table(
+            'generation',
+            sa.Column('name', sa.String(64), nullable=False),
+            sa.Column('value', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('name')
+        )
+    op.execute(
+        "insert into generation (name, value) "
+        "select 'authz', 0 where not exists (select 1 from generation where name = 'authz')"
+    )
+
+
+def downgrade():
+    op.drop_table('generation')
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('authz_version')
@@ -0,0 +1,82 @@
+"""entity versions
+
+Revision ID: e41c9a7d5b26
+Revises: b7d2e94f0a13
+Create Date: 2026-10-18 17:03:21.118734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e41c9a7d5b26'
+down_revision = 'b7d2e94f0a13'
+branch_labels = None
+depends_on = None
+
+
+SEARCH_INDEXES = {
+    'user': ('user_search', ('username', 'name')),
+    'group': ('group_search', ('name',)),
+    'permission': ('permission_search', ('name',)),
+}
+
+
+def _has_table(name: str) -> bool:
+    return op.get_bind().execute(
+        sa.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': name}
+    ).first() is not None
+
+
+def _create_triggers(only_indexed_columns: bool):
+    for table, (fts_table, columns) in SEARCH_INDEXES.items():
+        if not _has_table(fts_table):
+            continue
+        cols = ', '.join(columns)
+        new_values = ', '.join(f'new.{c}' for c in columns)
+        old_values = ', '.join(f'old.{c}' for c in columns)
+        update_event = f'UPDATE OF {cols}' if only_indexed_columns else 'UPDATE'
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {fts_table}_{suffix}')
+        op.execute(
+            f'CREATE TRIGGER {fts_table}_ai AFTER INSERT ON "{table}" BEGIN '
+            f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.rowid, {new_values}); END"
+        )
+        op.execute(
+            f'CREATE TRIGGER {fts_table}_ad AFTER DELETE ON "{table}" BEGIN '
+            f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.rowid, {old_values}); END"
+        )
+        op.execute(
+            f'CREATE TRIGGER {fts_table}_au AFTER {update_event} ON "{table}" BEGIN '
+            f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.rowid, {old_values}); "
+            f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.rowid, {new_values}); END"
+        )
+
+
+def upgrade():
+    # Databases bootstrapped by db.create_all() already have these.
+    inspector = sa.inspect(op.get_bind())
+    for table in ('group', 'permission'):
+        if 'version' not in {c['name'] for c in inspector.get_columns(table)}:
+            op.add_column(table, sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute(
+        "insert into generation (name, value) "
+        "select 'users', 0 where not exists (select 1 from generation where name = 'users')"
+    )
+
+    # Version bumps touch every row a write relates to; keep them from rewriting the search index.
+    if op.get_bind().dialect.name == 'sqlite':
+        _create_triggers(only_indexed_columns=True)
+
+
+def downgrade():
+    for table in ('group', 'permission'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('version')
+    op.execute("delete from generation where name = 'users'")
+
+    # SQLite batch mode rebuilds the tables, which drops their triggers.
+    if op.get_bind().dialect.name == 'sqlite':
+        _create_triggers(only_indexed_columns=False)
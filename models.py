@@ -1,8 +1,13 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, select
 from sqlalchemy.orm import Mapped, relationship
-from typing import List
-from werkzeug.security import generate_password_hash, check_password_hash
+from typing import List, Optional, Tuple
 from flask_migrate import Migrate
+from iam.common.permission_matcher import compile_grants
+from iam.library.metrics import request_metrics
+from iam.library.password import password_hasher
+from iam.library.permission_cache import Rights, permission_cache
+from iam.library.rbac_snapshot import RbacSnapshot, rbac_graph
 import uuid
 
 db = SQLAlchemy()
@@ -11,14 +16,38 @@ migrate = Migrate()
 
 users_to_groups = db.Table(
     'users_to_groups',
-    db.Column('group_id', db.String(122), db.ForeignKey('group.id')),
-    db.Column('user_id', db.String(122), db.ForeignKey('user.id'))
+    db.Column('group_id', db.String(122), db.ForeignKey('group.id'), nullable=False),
+    db.Column('user_id', db.String(122), db.ForeignKey('user.id'), nullable=False),
+    db.PrimaryKeyConstraint('group_id', 'user_id', name='pk_users_to_groups'),
+    db.Index('ix_users_to_groups_user_id', 'user_id', 'group_id')
 )
 
 group_to_permissions = db.Table(
     'group_to_permissions',
-    db.Column('permission_id', db.String(122), db.ForeignKey('permission.id')),
-    db.Column('group_id', db.String(122), db.ForeignKey('group.id')),
+    db.Column('permission_id', db.String(122), db.ForeignKey('permission.id'), nullable=False),
+    db.Column('group_id', db.String(122), db.ForeignKey('group.id'), nullable=False),
+    db.PrimaryKeyConstraint('group_id', 'permission_id', name='pk_group_to_permissions'),
+    db.Index('ix_group_to_permissions_permission_id', 'permission_id', 'group_id')
+)
+
+# Direct subgroup edges; a user in a child group is also a member of the parent.
+group_to_groups = db.Table(
+    'group_to_groups',
+    db.Column('parent_id', db.String(122), db.ForeignKey('group.id'), nullable=False),
+    db.Column('child_id', db.String(122), db.ForeignKey('group.id'), nullable=False),
+    db.PrimaryKeyConstraint('parent_id', 'child_id', name='pk_group_to_groups'),
+    db.Index('ix_group_to_groups_child_id', 'child_id', 'parent_id')
+)
+
+# Transitive closure of group_to_groups, kept up to date by library/group_hierarchy.py.
+# Every group is its own ancestor at depth 0, so a join through it covers direct membership too.
+group_closure = db.Table(
+    'group_closure',
+    db.Column('ancestor_id', db.String(122), db.ForeignKey('group.id'), nullable=False),
+    db.Column('descendant_id', db.String(122), db.ForeignKey('group.id'), nullable=False),
+    db.Column('depth', db.Integer(), nullable=False),
+    db.PrimaryKeyConstraint('ancestor_id', 'descendant_id', name='pk_group_closure'),
+    db.Index('ix_group_closure_descendant_id', 'descendant_id', 'ancestor_id')
 )
 
 
@@ -26,10 +55,26 @@ def generate_uuid():
     return str(uuid.uuid4())
 
 
-class Permission(db.Model):
+class ShortProjection:
+    # Columns of `short`, so lists can read plain rows instead of building ORM instances.
+    short_fields: Tuple[str, ...] = ()
+
+    @classmethod
+    def short_query(cls):
+        return db.session.query(*[getattr(cls, field) for field in cls.short_fields])
+
+    @classmethod
+    def short_rows(cls, rows) -> List[dict]:
+        # Much cheaper than Row._asdict() per row.
+        return [dict(zip(cls.short_fields, row)) for row in rows]
+
+
+class Permission(ShortProjection, db.Model):
+    short_fields = ('id', 'name', 'description')
     id = db.Column(db.String(122), default=generate_uuid, primary_key=True)
     name = db.Column(db.String(122), unique=True)
     description = db.Column(db.Text(), nullable=True)
+    version = db.Column(db.Integer(), default=0, server_default='0', nullable=False)
     groups: Mapped[List["Group"]] = relationship(
         secondary=group_to_permissions, back_populates='permissions'
     )
@@ -43,16 +88,19 @@ class Permission(db.Model):
         }
 
     @property
-    def full(self):
-        return {
-            **self.short,
-            'groups': [g.short for g in self.groups]
-        }
+    def user_ids(self) -> List[str]:
+        return [
+            row.user_id for row in effective_memberships(users_to_groups.c.user_id).distinct()
+            .join(group_to_permissions, group_to_permissions.c.group_id == group_closure.c.ancestor_id)
+            .filter(group_to_permissions.c.permission_id == self.id)
+        ]
 
 
-class Group(db.Model):
+class Group(ShortProjection, db.Model):
+    short_fields = ('id', 'name')
     id = db.Column(db.String(122), default=generate_uuid, primary_key=True)
     name = db.Column(db.String(122), unique=True)
+    version = db.Column(db.Integer(), default=0, server_default='0', nullable=False)
     users: Mapped[List["User"]] = relationship(
         secondary=users_to_groups, back_populates='groups'
     )
@@ -68,30 +116,56 @@ class Group(db.Model):
         }
 
     @property
-    def full(self) -> dict:
-        return {
-            **self.short,
-            'users': [u.short for u in self.users],
-            'permissions': [p.short for p in self.permissions]
-        }
+    def user_ids(self) -> List[str]:
+        # Members of subgroups included.
+        return [
+            row.user_id for row in effective_memberships(users_to_groups.c.user_id).distinct()
+            .filter(group_closure.c.ancestor_id == self.id)
+        ]
 
 
-class User(db.Model):
+class User(ShortProjection, db.Model):
+    short_fields = ('id', 'active', 'username', 'name')
     id = db.Column(db.String(122), default=generate_uuid, primary_key=True)
     active = db.Column(db.Boolean(), default=False)
-    username = db.Column(db.String(122))
+    username = db.Column(db.String(122), unique=True, index=True)
     name = db.Column(db.String(122))
     password_hash = db.Column(db.String(122))
+    authz_version = db.Column(db.Integer(), default=0, server_default='0', nullable=False)
     groups: Mapped[List[Group]] = relationship(
         secondary=users_to_groups, back_populates='users'
     )
 
+    def _effective_rights(self, versions: Optional[List[int]] = None) -> Rights:
+        # `versions` are the [authz_version, authz generation] the caller needs the rights to be current for.
+        if self.id is None:
+            perms = []
+            for group in self.groups:
+                perms += [p.name for p in group.permissions]
+            # Not in the closure yet: only the direct groups are known.
+            names = tuple(group.name for group in self.groups)
+            return names, names, tuple(set(perms))
+
+        rights = permission_cache.get(self.id, versions)
+        if rights is None:
+            # Only the membership comes from the database; the graph snapshot does the rest.
+            rows = effective_memberships(
+                users_to_groups.c.group_id, group_closure.c.ancestor_id, Generation.value_of('authz')
+            ).filter(users_to_groups.c.user_id == self.id).all()
+            # Without memberships the generation is unknown; asking for any would reload the graph.
+            rights = ((), (), ())
+            if rows:
+                rights = rbac_snapshot(rows[0][2]).resolve(
+                    [group_id for _, group_id, _ in rows], [direct_id for direct_id, _, _ in rows]
+                )
+                if versions is None:
+                    versions = [self.authz_version, rows[0][2] or 0]
+            permission_cache.set(self.id, rights, versions)
+        return rights
+
     @property
     def permissions(self) -> List[str]:
-        perms = []
-        for group in self.groups:
-            perms += [p.name for p in group.permissions]
-        return list(set(perms))
+        return list(self._effective_rights()[2])
 
     @property
     def short(self) -> dict:
@@ -104,14 +178,19 @@ class User(db.Model):
 
     @property
     def identity(self) -> dict:
+        return self.identity_at()
+
+    def identity_at(self, versions: Optional[List[int]] = None) -> dict:
+        groups, effective_groups, permissions = self._effective_rights(versions)
         return {
             **self.short,
-            'groups': [group.name for group in self.groups],
-            'permissions': self.permissions
+            'groups': list(groups),
+            'effective_groups': list(effective_groups),
+            'permissions': list(permissions)
         }
 
     def has_permission(self, permission) -> bool:
-        return permission in self.permissions
+        return compile_grants(frozenset(self._effective_rights()[2])).matches(permission)
 
     @property
     def password(self) -> str:
@@ -119,9 +198,89 @@ class User(db.Model):
 
     @password.setter
     def password(self, value: str):
-        self.password_hash = generate_password_hash(value)
+        self.password_hash = password_hasher.hash(value)
 
     def check_pass(self, password: str) -> bool:
         if password is None:
             return False
-        return check_password_hash(self.password_hash, password)
+        with request_metrics.timed('password'):
+            return password_hasher.check(self.password_hash, password)
+
+
+class RevokedToken(db.Model):
+    # Workers load new rows by id (see RevocationList); AUTOINCREMENT keeps SQLite from reusing ids after a purge.
+    __table_args__ = {'sqlite_autoincrement': True}
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True)
+    expires_at = db.Column(db.Float(), index=True)
+
+
+class TokenWatermark(db.Model):
+    user_id = db.Column(db.String(122), primary_key=True)
+    access_not_before = db.Column(db.Float(), default=0)
+    refresh_not_before = db.Column(db.Float(), default=0)
+    updated_at = db.Column(db.Float(), index=True)
+
+
+class Generation(db.Model):
+    name = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.Integer(), default=0, nullable=False)
+
+    @classmethod
+    def value_of(cls, name: str):
+        return select(cls.value).where(cls.name == name).scalar_subquery()
+
+
+# Counters the app bumps; the migrations seed the same rows.
+GENERATIONS = ('authz', 'users', 'changes', 'changes_compacted')
+
+
+@event.listens_for(Generation.__table__, 'after_create')
+def _seed_generations(table, connection, **kw):
+    # Lets databases bootstrapped by db.create_all() skip the insert-if-missing path.
+    connection.execute(table.insert(), [{'name': name, 'value': 0} for name in GENERATIONS])
+
+
+class ChangeLog(db.Model):
+    # AUTOINCREMENT keeps SQLite from reusing ids once compaction empties the table; ids are feed cursors.
+    __table_args__ = {'sqlite_autoincrement': True}
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(16), nullable=False)
+    entity_id = db.Column(db.String(122), nullable=False)
+    action = db.Column(db.String(16), nullable=False)
+    data = db.Column(db.JSON(), nullable=True)
+    created_at = db.Column(db.Float(), index=True)
+
+
+class PermissionCatalogVersion(db.Model):
+    # Every catalog a compact token was issued against, so any worker can decode it later.
+    __tablename__ = 'permission_catalog'
+    version = db.Column(db.String(12), primary_key=True)
+    names = db.Column(db.JSON(), nullable=False)
+    created_at = db.Column(db.Float())
+
+
+@event.listens_for(Group, 'after_insert')
+def _add_closure_row(mapper, connection, target):
+    connection.execute(group_closure.insert().values(ancestor_id=target.id, descendant_id=target.id, depth=0))
+
+
+def effective_memberships(*columns):
+    # users_to_groups expanded to every group each membership implies; select
+    # group_closure.c.ancestor_id for the effective group id.
+    return db.session.query(*columns).select_from(users_to_groups) \
+        .join(group_closure, group_closure.c.descendant_id == users_to_groups.c.group_id)
+
+
+def _load_rbac_graph() -> Tuple[int, list]:
+    rows = db.session.query(Group.id, Group.name, Permission.name, Generation.value_of('authz')) \
+        .outerjoin(group_to_permissions, group_to_permissions.c.group_id == Group.id) \
+        .outerjoin(Permission, Permission.id == group_to_permissions.c.permission_id) \
+        .all()
+    version = rows[0][3] if rows else None
+    return version or 0, [(group_id, group_name, permission_name) for group_id, group_name, permission_name, _ in rows]
+
+
+def rbac_snapshot(version: Optional[int]) -> RbacSnapshot:
+    # `version` is the authz generation read alongside the membership being resolved.
+    return rbac_graph.snapshot(version or 0, _load_rbac_graph)
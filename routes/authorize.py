@@ -0,0 +1,39 @@
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import jwt_required
+from iam.library.authorize import granted_pairs, validate_checks
+from iam.library.iam_jwt_user import IamJwtUser
+from iam.library.query_budget import query_budget
+from iam.library.validate import DataValidationError
+
+authorize_route = Blueprint("authorize", __name__)
+
+
+@authorize_route.route('/api/iam/authorize', methods=['POST'])
+@jwt_required()
+@query_budget(2)
+def authorize():
+    current_user = IamJwtUser()
+
+    if not current_user.has_rights('iam_users_manage'):
+        return jsonify({
+            'error': f"User {current_user.identity['username']} doesn't have permissions to check user rights"
+        }), 403
+
+    max_checks = current_app.config['AUTHORIZE_MAX_CHECKS']
+    try:
+        permission = request.json.get('permission', None)
+        if permission is not None:
+            users = request.json.get('users', None)
+            if not isinstance(users, list):
+                raise DataValidationError('Users must be a list of user ids.')
+            checks = validate_checks([[user_id, permission] for user_id in users], max_checks)
+        else:
+            checks = validate_checks(request.json.get('checks', None), max_checks)
+    except DataValidationError as e:
+        return jsonify(e.response), e.code
+
+    granted = granted_pairs(checks)
+
+    if permission is not None:
+        return jsonify({'error': None, 'allowed': [user_id for user_id, name in checks if (user_id, name) in granted]})
+    return jsonify({'error': None, 'results': [check in granted for check in checks]})
@@ -0,0 +1,110 @@
+import time
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from flask_jwt_extended import jwt_required
+from iam.library.change_feed import change_feed, check_cursor, fetch_changes, latest_cursor
+from iam.library.iam_jwt_user import IamJwtUser
+from iam.library.query_budget import query_budget
+from iam.library.validate import DataValidationError
+from iam.models import db
+
+get_changes_route = Blueprint('get_changes', __name__)
+
+ENTITY_RIGHTS = {
+    'user': 'iam_users_manage',
+    'group': 'iam_group_manage',
+    'permission': 'iam_permission_manage',
+}
+
+
+def _page(changes: list, since: int) -> dict:
+    return {'error': None, 'data': changes, 'next': changes[-1]['id'] if changes else since}
+
+
+def _long_poll(since: int, entities: list, per_page: int, seen: int, wait: float):
+    deadline = time.monotonic() + wait
+    changes = []
+    while not changes:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        # Don't hold a pooled connection while nothing happens.
+        db.session.close()
+        change_feed.wait(seen, min(remaining, current_app.config['CHANGE_FEED_POLL_INTERVAL']))
+        seen = change_feed.sequence
+        changes = fetch_changes(since, entities, per_page)
+    yield current_app.json.dumps(_page(changes, since))
+
+
+def _event_stream(since: int, entities: list, per_page: int):
+    config = current_app.config
+    deadline = time.monotonic() + config['CHANGE_FEED_STREAM_MAX']
+    last_sent = time.monotonic()
+    # Streams end after a while; EventSource reconnects with Last-Event-ID and resumes.
+    while time.monotonic() < deadline:
+        seen = change_feed.sequence
+        changes = fetch_changes(since, entities, per_page)
+        db.session.close()
+        for change in changes:
+            yield f"id: {change['id']}\nevent: change\ndata: {current_app.json.dumps(change)}\n\n"
+        if changes:
+            since, last_sent = changes[-1]['id'], time.monotonic()
+            if len(changes) == per_page:
+                continue
+        elif time.monotonic() - last_sent >= config['CHANGE_FEED_HEARTBEAT']:
+            yield ': keepalive\n\n'
+            last_sent = time.monotonic()
+        change_feed.wait(seen, config['CHANGE_FEED_POLL_INTERVAL'])
+
+
+@get_changes_route.route('/api/iam/changes', methods=['GET'])
+@jwt_required()
+@query_budget(2)
+def get_changes():
+    current_user = IamJwtUser()
+    entities = [entity for entity, right in ENTITY_RIGHTS.items() if current_user.has_rights(right)]
+
+    if not entities:
+        return jsonify({
+            'error': f"User {current_user.identity['username']} doesn't have permissions to read changes"
+        }), 403
+
+    since = request.args.get('since', request.headers.get('Last-Event-ID', None))
+    # Without a cursor, hand out the current position: reload, then follow the feed from there.
+    if since is None or since == '':
+        return jsonify({'error': None, 'data': [], 'next': latest_cursor()})
+
+    config = current_app.config
+    try:
+        per_page = int(request.args.get('per_page', config['PAGINATION_MAX_PER_PAGE']))
+    except ValueError:
+        per_page = config['PAGINATION_MAX_PER_PAGE']
+    per_page = min(max(per_page, 1), config['PAGINATION_MAX_PER_PAGE'])
+    try:
+        wait = min(max(float(request.args.get('wait', 0)), 0), config['CHANGE_FEED_MAX_WAIT'])
+    except ValueError:
+        wait = 0
+
+    try:
+        try:
+            since = int(since)
+        except ValueError:
+            raise DataValidationError('Invalid cursor.')
+        check_cursor(since)
+    except DataValidationError as e:
+        return jsonify(e.response), e.code
+
+    if request.accept_mimetypes.best == 'text/event-stream':
+        return Response(
+            stream_with_context(_event_stream(since, entities, per_page)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    seen = change_feed.sequence
+    changes = fetch_changes(since, entities, per_page)
+    if changes or wait == 0:
+        return jsonify(_page(changes, since))
+    return Response(
+        stream_with_context(_long_poll(since, entities, per_page, seen, wait)),
+        mimetype='application/json'
+    )
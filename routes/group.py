@@ -1,6 +1,17 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required
+from iam.library.authz_version import AUTHZ_GENERATION, bump_global_version, generation_value
+from iam.library.change_feed import change_feed
+from iam.library.conditional import make_etag, not_modified, with_etag
+from iam.library.entity_version import bump_group_parents, bump_group_permissions, bump_versions
+from iam.library.group_hierarchy import remove_group, set_subgroups
 from iam.library.iam_jwt_user import IamJwtUser
+from iam.library.membership import group_detail, group_permissions, group_subgroups, group_users, \
+    member_list_response
+from iam.library.pagination import is_keyset_request, keyset_paginate
+from iam.library.permission_cache import permission_cache
+from iam.library.query_budget import query_budget
+from iam.library.search import search_clause
 from iam.library.validate import validate_group_name, DataValidationError
 from iam.models import db, Group, Permission
 
@@ -10,10 +21,14 @@ delete_group_route = Blueprint('delete_group', __name__)
 get_groups_route = Blueprint('get_groups', __name__)
 get_group_route = Blueprint('get_group', __name__)
 edit_group_route = Blueprint('edit_group', __name__)
+get_group_users_route = Blueprint('get_group_users', __name__)
+get_group_permissions_route = Blueprint('get_group_permissions', __name__)
+get_group_groups_route = Blueprint('get_group_groups', __name__)
 
 
 @create_group_route.route('/api/iam/group', methods=['POST'])
 @jwt_required()
+@query_budget(6)
 def create_group():
     user = IamJwtUser()
     if not user.has_rights('iam_group_manage'):
@@ -25,12 +40,16 @@ def create_group():
         return jsonify(e.response), e.code
     group = Group(name=name)
     db.session.add(group)
+    db.session.flush()
+    bump_global_version()
+    change_feed.record('group', group.id, 'create', {**group.short, 'permissions': []})
     db.session.commit()
     return jsonify({'error': None})
 
 
 @delete_group_route.route('/api/iam/group/<id>', methods=['DELETE'])
 @jwt_required()
+@query_budget(16)
 def delete_group(id: str):
     user = IamJwtUser()
     id = str(id)
@@ -41,39 +60,62 @@ def delete_group(id: str):
     if group is None:
         return {'error': 'Group not found.'}, 404
 
+    user_ids = group.user_ids
+    bump_group_permissions(group.id)
+    bump_group_parents(group.id)
+    change_feed.record('group', group.id, 'delete')
+    remove_group(group.id)
     db.session.delete(group)
+    bump_global_version()
     db.session.commit()
+    permission_cache.invalidate(*user_ids)
     return jsonify({'error': None})
 
 
 @get_groups_route.route('/api/iam/group', methods=['GET'])
 @jwt_required()
+@query_budget(4)
 def get_groups():
     user = IamJwtUser()
     if not user.has_rights('iam_group_manage'):
         return jsonify({'error': f"User {user.identity['username']} doesn't have rights to list groups."})
 
+    # Every group write bumps the authz generation already.
+    etag = make_etag('groups', generation_value(AUTHZ_GENERATION))
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    search = request.args.get('search', None)
+    filtered = search is not None and search != ''
+    query = Group.short_query()
+    if filtered:
+        query = query.filter(search_clause(Group, search))
+
+    if is_keyset_request():
+        try:
+            groups = keyset_paginate(query, Group.id, filtered)
+        except DataValidationError as e:
+            return jsonify(e.response), e.code
+        return with_etag(jsonify(groups.response(Group.short_rows(groups.items))), etag)
+
     try:
         page = int(request.args.get('page', 1))
     except ValueError:
         page = 1
+    groups = query.paginate(page=page, per_page=10)
 
-    search = request.args.get('search', None)
-    if search is not None and search != '':
-        groups = Group.query.filter(Group.name.like(f'%{search}%')).paginate(page=page, per_page=10)
-    else:
-        groups = Group.query.paginate(page=page, per_page=10)
-
-    return jsonify({
+    return with_etag(jsonify({
         'error': None,
-        'data': [g.short for g in groups.items],
+        'data': Group.short_rows(groups.items),
         'pages': groups.pages,
         'page': groups.page
-    })
+    }), etag)
 
 
 @get_group_route.route('/api/iam/group/<id>', methods=['GET'])
 @jwt_required()
+@query_budget(7)
 def get_group(id: str):
     user = IamJwtUser()
     id = str(id)
@@ -86,11 +128,83 @@ def get_group(id: str):
     if group is None:
         return {'error': 'Group not found.'}, 404
 
-    return jsonify({'error': None, 'data': group.full})
+    etag = make_etag('group', group.version)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    return with_etag(jsonify({'error': None, 'data': group_detail(group)}), etag)
+
+
+@get_group_users_route.route('/api/iam/group/<id>/users', methods=['GET'])
+@jwt_required()
+@query_budget(4)
+def get_group_users(id: str):
+    user = IamJwtUser()
+    id = str(id)
+
+    if not user.has_rights('iam_group_manage'):
+        return jsonify({'error': f"User {user.identity['username']} doesn't have rights to get groups."}), 403
+
+    version = db.session.query(Group.version).filter(Group.id == id).scalar()
+    if version is None:
+        return {'error': 'Group not found.'}, 404
+
+    etag = make_etag('group', version)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    return with_etag(member_list_response(group_users(id)), etag)
+
+
+@get_group_permissions_route.route('/api/iam/group/<id>/permissions', methods=['GET'])
+@jwt_required()
+@query_budget(4)
+def get_group_permissions(id: str):
+    user = IamJwtUser()
+    id = str(id)
+
+    if not user.has_rights('iam_group_manage'):
+        return jsonify({'error': f"User {user.identity['username']} doesn't have rights to get groups."}), 403
+
+    version = db.session.query(Group.version).filter(Group.id == id).scalar()
+    if version is None:
+        return {'error': 'Group not found.'}, 404
+
+    etag = make_etag('group', version)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    return with_etag(member_list_response(group_permissions(id)), etag)
+
+
+@get_group_groups_route.route('/api/iam/group/<id>/groups', methods=['GET'])
+@jwt_required()
+@query_budget(4)
+def get_group_groups(id: str):
+    user = IamJwtUser()
+    id = str(id)
+
+    if not user.has_rights('iam_group_manage'):
+        return jsonify({'error': f"User {user.identity['username']} doesn't have rights to get groups."}), 403
+
+    version = db.session.query(Group.version).filter(Group.id == id).scalar()
+    if version is None:
+        return {'error': 'Group not found.'}, 404
+
+    etag = make_etag('group', version)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    return with_etag(member_list_response(group_subgroups(id)), etag)
 
 
 @edit_group_route.route('/api/iam/group/<id>', methods=['PUT'])
 @jwt_required()
+@query_budget(20)
 def edit_group(id: str):
     user = IamJwtUser()
     id = str(id)
@@ -104,19 +218,42 @@ def edit_group(id: str):
         return {'error': 'Group not found.'}, 404
 
     try:
+        # Before any membership change, so the permissions the group drops are bumped too.
+        bump_group_permissions(group.id)
+        bump_group_parents(group.id)
         name = request.json.get('name', None)
         permissions = request.json.get('permissions', None)
+        subgroups = request.json.get('groups', None)
+        changes = {}
+        hierarchy_changed = False
 
         if name is not None:
             validate_group_name(name)
             name = str(name)
             group.name = name
+            changes['name'] = name
 
         if permissions is not None:
             permissions = list(permissions)
             group.permissions = Permission.query.filter(Permission.name.in_(permissions)).all()
+            bump_versions(Permission, [permission.id for permission in group.permissions])
+            changes['permissions'] = [permission.id for permission in group.permissions]
+
+        if subgroups is not None:
+            subgroups = list(subgroups)
+            child_ids = [row.id for row in db.session.query(Group.id).filter(Group.name.in_(subgroups))]
+            hierarchy_changed = set_subgroups(group.id, child_ids)
+            changes['groups'] = child_ids
 
+        group.version = Group.version + 1
+        bump_global_version()
+        change_feed.record('group', group.id, 'update', changes)
         db.session.commit()
+        if hierarchy_changed:
+            # Members of every group below, before and after the edit, are affected.
+            permission_cache.clear()
+        elif name is not None or permissions is not None:
+            permission_cache.invalidate(*group.user_ids)
 
         return jsonify({'error': None})
 
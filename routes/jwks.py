@@ -0,0 +1,17 @@
+from flask import Blueprint, current_app, jsonify
+from iam.library.query_budget import query_budget
+
+jwks_route = Blueprint("jwks", __name__)
+
+
+@jwks_route.route('/.well-known/jwks.json', methods=['GET'])
+@query_budget(0)
+def jwks():
+    signing_keys = current_app.extensions.get('iam_signing_keys', None)
+    if signing_keys is None:
+        return jsonify({'error': 'Tokens are signed with a shared secret.'}), 404
+
+    response = jsonify(signing_keys.jwks)
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config['JWKS_MAX_AGE']
+    return response
@@ -0,0 +1,13 @@
+from flask import Blueprint, jsonify
+from iam.library.metrics import request_metrics
+from iam.library.query_budget import query_budget
+
+metrics_route = Blueprint("metrics", __name__)
+
+
+@metrics_route.route('/metrics', methods=['GET'])
+@query_budget(0)
+def metrics():
+    if not request_metrics.enabled:
+        return jsonify({'error': 'Metrics are disabled.'}), 404
+    return request_metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
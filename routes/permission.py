@@ -1,6 +1,16 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required
+from iam.library.authz_version import AUTHZ_GENERATION, bump_global_version, generation_value
+from iam.library.change_feed import change_feed
+from iam.library.conditional import make_etag, not_modified, with_etag
+from iam.library.entity_version import bump_permission_groups
 from iam.library.iam_jwt_user import IamJwtUser
+from iam.library.membership import member_list_response, permission_detail, permission_groups
+from iam.library.pagination import is_keyset_request, keyset_paginate
+from iam.library.permission_cache import permission_cache
+from iam.library.query_budget import query_budget
+from iam.library.search import search_clause
+from iam.library.permission_catalog import current_catalog, get_catalog, reset_catalog
 from iam.library.validate import validate_permission_name, DataValidationError
 from iam.models import db, Group, Permission
 
@@ -10,10 +20,13 @@ delete_permission_route = Blueprint('delete_permission', __name__)
 get_permissions_route = Blueprint('get_permissions', __name__)
 get_permission_route = Blueprint('get_permission', __name__)
 edit_permission_route = Blueprint('edit_permission', __name__)
+get_permission_catalog_route = Blueprint('get_permission_catalog', __name__)
+get_permission_groups_route = Blueprint('get_permission_groups', __name__)
 
 
 @create_permission_route.route('/api/iam/permission', methods=['POST'])
 @jwt_required()
+@query_budget(5)
 def create_permission():
     user = IamJwtUser()
     if not user.has_rights('iam_permission_manage'):
@@ -26,12 +39,17 @@ def create_permission():
         return jsonify(e.response), e.code
     permission = Permission(name=name, description=description)
     db.session.add(permission)
+    db.session.flush()
+    bump_global_version()
+    change_feed.record('permission', permission.id, 'create', permission.short)
     db.session.commit()
+    reset_catalog()
     return jsonify({'error': None})
 
 
 @delete_permission_route.route('/api/iam/permission/<id>', methods=['DELETE'])
 @jwt_required()
+@query_budget(8)
 def delete_permission(id: str):
     user = IamJwtUser()
     id = str(id)
@@ -42,39 +60,61 @@ def delete_permission(id: str):
     if permission is None:
         return {'error': 'Permission not found.'}, 404
 
+    user_ids = permission.user_ids
+    bump_permission_groups(permission.id)
+    change_feed.record('permission', permission.id, 'delete')
     db.session.delete(permission)
+    bump_global_version()
     db.session.commit()
+    permission_cache.invalidate(*user_ids)
+    reset_catalog()
     return jsonify({'error': None})
 
 
 @get_permissions_route.route('/api/iam/permission/', methods=['GET'])
 @jwt_required()
+@query_budget(4)
 def get_permissions():
     user = IamJwtUser()
     if not user.has_rights('iam_permission_manage'):
         return jsonify({'error': f"User {user.identity['username']} doesn't have rights to list permissions."})
 
+    # Every permission write bumps the authz generation already.
+    etag = make_etag('permissions', generation_value(AUTHZ_GENERATION))
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    search = request.args.get('search', None)
+    filtered = search is not None and search != ''
+    query = Permission.short_query()
+    if filtered:
+        query = query.filter(search_clause(Permission, search))
+
+    if is_keyset_request():
+        try:
+            permission = keyset_paginate(query, Permission.id, filtered)
+        except DataValidationError as e:
+            return jsonify(e.response), e.code
+        return with_etag(jsonify(permission.response(Permission.short_rows(permission.items))), etag)
+
     try:
         page = int(request.args.get('page', 1))
     except ValueError:
         page = 1
+    permission = query.paginate(page=page, per_page=10)
 
-    search = request.args.get('search', None)
-    if search is not None and search != '':
-        permission = Permission.query.filter(Permission.name.like(f'%{search}%')).paginate(page=page, per_page=10)
-    else:
-        permission = Permission.query.paginate(page=page, per_page=10)
-
-    return jsonify({
+    return with_etag(jsonify({
         'error': None,
-        'data': [p.short for p in permission.items],
+        'data': Permission.short_rows(permission.items),
         'pages': permission.pages,
         'page': permission.page
-    })
+    }), etag)
 
 
 @get_permission_route.route('/api/iam/permission/<id>', methods=['GET'])
 @jwt_required()
+@query_budget(3)
 def get_permission(id: str):
     user = IamJwtUser()
     id = str(id)
@@ -87,11 +127,39 @@ def get_permission(id: str):
     if permission is None:
         return {'error': 'Permission not found.'}, 404
 
-    return jsonify({'error': None, 'data': permission.full})
+    etag = make_etag('permission', permission.version)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    return with_etag(jsonify({'error': None, 'data': permission_detail(permission)}), etag)
+
+
+@get_permission_groups_route.route('/api/iam/permission/<id>/groups', methods=['GET'])
+@jwt_required()
+@query_budget(4)
+def get_permission_groups(id: str):
+    user = IamJwtUser()
+    id = str(id)
+
+    if not user.has_rights('iam_permission_manage'):
+        return jsonify({'error': f"User {user.identity['username']} doesn't have rights to get permissions."}), 403
+
+    version = db.session.query(Permission.version).filter(Permission.id == id).scalar()
+    if version is None:
+        return {'error': 'Permission not found.'}, 404
+
+    etag = make_etag('permission', version)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    return with_etag(member_list_response(permission_groups(id)), etag)
 
 
 @edit_permission_route.route('/api/iam/permission/<id>', methods=['PUT'])
 @jwt_required()
+@query_budget(8)
 def edit_permission(id: str):
     user = IamJwtUser()
     id = str(id)
@@ -107,17 +175,29 @@ def edit_permission(id: str):
     try:
         name = request.json.get('name', None)
         description = request.json.get('description', None)
+        changes = {}
 
         if name is not None:
             validate_permission_name(name)
             name = str(name)
             permission.name = name
+            changes['name'] = name
 
         if description is not None:
             description = str(description)
             permission.description = description
-
+            changes['description'] = description
+
+        permission.version = Permission.version + 1
+        # Holders of a renamed permission; read before the commit expires the permission.
+        user_ids = permission.user_ids if name is not None else []
+        bump_permission_groups(permission.id)
+        bump_global_version()
+        change_feed.record('permission', permission.id, 'update', changes)
         db.session.commit()
+        if name is not None:
+            permission_cache.invalidate(*user_ids)
+            reset_catalog()
 
         return jsonify({'error': None})
 
@@ -127,8 +207,14 @@ def edit_permission(id: str):
         return jsonify(e.response), e.code
 
 
+@get_permission_catalog_route.route('/api/iam/permission/catalog', methods=['GET'])
+@jwt_required()
+@query_budget(2)
+def get_permission_catalog():
+    version = request.args.get('version', None)
+    catalog = current_catalog() if version is None else get_catalog(version)
 
+    if catalog is None:
+        return {'error': 'Catalog version not found.'}, 404
 
-
-
-
+    return jsonify({'error': None, 'version': catalog.version, 'permissions': list(catalog.names)})
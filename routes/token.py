@@ -1,38 +1,76 @@
-from flask import Blueprint, jsonify, abort, request
-from iam.models import User
-from flask_jwt_extended import jwt_required, create_access_token, create_refresh_token
-from iam.library.iam_jwt_user import IamJwtUser
+import time
+from flask import Blueprint, current_app, jsonify, abort, request
+from sqlalchemy.exc import OperationalError
+from flask_jwt_extended import jwt_required, create_access_token, create_refresh_token, get_jwt, get_jwt_identity
+from iam.library.authz_version import current_versions
+from iam.library.identity import load_identity
+from iam.library.password import password_hasher
+from iam.library.permission_catalog import token_identity
+from iam.library.query_budget import query_budget
+from iam.library.revocation import ISSUED_MS_CLAIM, revocation_list
+from iam.models import db
 
 get_token_route = Blueprint("get_token", __name__)
 refresh_token_route = Blueprint("refresh_token", __name__)
+revoke_token_route = Blueprint("revoke_token", __name__)
+
+
+def issue_tokens(identity: dict, versions: list):
+    claims = {'authz': versions, ISSUED_MS_CLAIM: int(time.time() * 1000)}
+    return jsonify({
+        "error": None,
+        "access_token": create_access_token(identity=identity, additional_claims=claims),
+        "refresh_token": create_refresh_token(identity=identity, additional_claims=claims)
+    })
 
 
 @get_token_route.route('/api/iam/token', methods=['POST'])
+@query_budget(5)
 def get_token():
     username = request.json.get("username", None)
     password = request.json.get("password", None)
-    user = User.query.filter_by(username=username).first()
+    user, identity, versions = load_identity(username=username)
     if user is None:
         return jsonify({"error": "Bad username or password"}), 401
     if not user.check_pass(password):
         return jsonify({"error": "Bad username or password"}), 401
-
-    return jsonify({
-        "error": None,
-        "access_token": create_access_token(identity=user.identity),
-        "refresh_token": create_refresh_token(identity=user.identity)
-    })
+    if current_app.config['REQUIRE_ACTIVE_USERS'] and not user.active:
+        return jsonify({"error": "User is deactivated"}), 403
+    if password_hasher.needs_rehash(user.password_hash):
+        user.password = password
+        try:
+            db.session.commit()
+        except OperationalError:
+            # The upgrade is opportunistic; a busy database just retries it next login.
+            db.session.rollback()
+    return issue_tokens(token_identity(identity), versions)
 
 
 @refresh_token_route.route('/api/iam/token', methods=['GET'])
 @jwt_required(refresh=True)
+@query_budget(5)
 def refresh_token():
-    user_token = IamJwtUser()
-    user = user_token.get_db_obj()
+    identity = get_jwt_identity()
+    stamped = get_jwt().get('authz', None)
+    versions = current_versions(identity['id'])
+    if versions is None:
+        return {'error': 'User not found.'}, 403
+    # Nothing that feeds the identity changed since it was issued: re-sign it as is.
+    if stamped == versions:
+        return issue_tokens(identity, versions)
+
+    user, identity, versions = load_identity(id=identity['id'])
     if user is None:
         return {'error': 'User not found.'}, 403
-    return jsonify({
-        "error": None,
-        "access_token": create_access_token(identity=user.identity),
-        "refresh_token": create_refresh_token(identity=user.identity)
-    })
+    if current_app.config['REQUIRE_ACTIVE_USERS'] and not user.active:
+        return {'error': 'User is deactivated.'}, 403
+    return issue_tokens(token_identity(identity), versions)
+
+
+@revoke_token_route.route('/api/iam/token', methods=['DELETE'])
+@jwt_required(verify_type=False)
+@query_budget(1)
+def revoke_token():
+    revocation_list.revoke_token(get_jwt())
+    db.session.commit()
+    return jsonify({"error": None})
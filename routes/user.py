@@ -1,7 +1,20 @@
-from flask import Blueprint, jsonify, request
+import json
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 from iam.models import db, User, Group
 from flask_jwt_extended import jwt_required
+from iam.library.authz_version import USERS_GENERATION, bump_generation, bump_user_version, generation_value, \
+    global_version_column
+from iam.library.bulk_import import import_users, parse_rows
+from iam.library.change_feed import change_feed
+from iam.library.conditional import make_etag, not_modified, with_etag
+from iam.library.entity_version import bump_user_groups, bump_versions
+from iam.library.export import export_users, format_rows
 from iam.library.iam_jwt_user import IamJwtUser
+from iam.library.pagination import is_keyset_request, keyset_paginate
+from iam.library.permission_cache import permission_cache
+from iam.library.query_budget import query_budget
+from iam.library.revocation import revocation_list
+from iam.library.search import search_clause
 from iam.library.validate import validate_password, validate_name, validate_username, DataValidationError
 
 create_user_route = Blueprint("create_user", __name__)
@@ -9,9 +22,12 @@ get_users_route = Blueprint("get_users", __name__)
 get_user_route = Blueprint("get_user", __name__)
 edit_user_route = Blueprint("edit_user", __name__)
 delete_user_route = Blueprint("delete_user", __name__)
+import_users_route = Blueprint("import_users", __name__)
+export_users_route = Blueprint("export_users", __name__)
 
 
 @create_user_route.route('/api/iam/user', methods=['POST'])
+@query_budget(8)
 def create_user():
     username = str(request.json.get('username', None))
     password = str(request.json.get('password', None))
@@ -37,6 +53,14 @@ def create_user():
     )
 
     db.session.add(new_user)
+    db.session.flush()
+    if default_group is not None:
+        bump_versions(Group, [default_group.id])
+    bump_generation(USERS_GENERATION)
+    change_feed.record('user', new_user.id, 'create', {
+        **new_user.short,
+        'groups': [default_group.id] if default_group is not None else []
+    })
     db.session.commit()
     return jsonify({
         'error': None
@@ -45,6 +69,7 @@ def create_user():
 
 @get_users_route.route('/api/iam/user', methods=['GET'])
 @jwt_required()
+@query_budget(4)
 def get_users():
     user = IamJwtUser()
 
@@ -53,26 +78,40 @@ def get_users():
             'error': f'User {user.identity["username"]} don\'t have permissions to list users'
         }), 403
 
+    etag = make_etag('users', generation_value(USERS_GENERATION))
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    search = request.args.get('search', None)
+    filtered = search is not None and search != ''
+    query = User.short_query()
+    if filtered:
+        query = query.filter(search_clause(User, search))
+
+    if is_keyset_request():
+        try:
+            users = keyset_paginate(query, User.id, filtered)
+        except DataValidationError as e:
+            return jsonify(e.response), e.code
+        return with_etag(jsonify(users.response(User.short_rows(users.items))), etag)
+
     try:
         page = int(request.args.get('page', 1))
     except ValueError:
         page = 1
-
-    search = request.args.get('search', None)
-    if search is not None and search != '':
-        users = User.query.filter(User.username.like(f'%{search}%')).paginate(page=page, per_page=10)
-    else:
-        users = User.query.paginate(page=page, per_page=10)
-    return jsonify({
+    users = query.paginate(page=page, per_page=10)
+    return with_etag(jsonify({
         'error': None,
-        'data': [u.short for u in users.items],
+        'data': User.short_rows(users.items),
         'pages': users.pages,
         'page': users.page
-    })
+    }), etag)
 
 
 @get_user_route.route('/api/iam/user/<id>', methods=['GET'])
 @jwt_required()
+@query_budget(3)
 def get_user(id: str = 'self'):
     try:
         id = str(id)
@@ -81,23 +120,33 @@ def get_user(id: str = 'self'):
     current_user = IamJwtUser()
 
     if id == 'self':
-        return jsonify(current_user.identity)
+        return jsonify({**current_user.identity, 'permissions': list(current_user.permissions)})
 
     if not current_user.has_rights('iam_users_manage'):
         return jsonify({
             'error': f"User {current_user.identity['username']} doesn't have permissions to view users"
         }), 403
 
-    user = User.query.get(id)
+    # The identity changes with the user's own version or with any group or permission edit.
+    row = db.session.query(User, global_version_column()).filter(User.id == id).first()
 
-    if user is None:
+    if row is None:
         return {'error': 'User not found.'}, 404
 
-    return jsonify({'error': None, 'data': user.identity})
+    user, global_version = row
+    versions = [user.authz_version, global_version or 0]
+    etag = make_etag('user', *versions)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    # The body must match the ETag's versions, not whatever this process cached earlier.
+    return with_etag(jsonify({'error': None, 'data': user.identity_at(versions)}), etag)
 
 
 @edit_user_route.route('/api/iam/user/<id>', methods=['PUT'])
 @jwt_required()
+@query_budget(14)
 def edit_user(id: str = 'self'):
     try:
         id = str(id)
@@ -119,9 +168,13 @@ def edit_user(id: str = 'self'):
         return {'error': 'User not found.'}, 404
 
     try:
+        # Before any membership change, so the groups the user leaves are bumped too.
+        bump_user_groups(user.id)
         name = request.json.get('name', None)
         password, old_password = request.json.get('password', None), request.json.get('old_password', None)
         groups = request.json.get('groups', None)
+        active = request.json.get('active', None)
+        changes = {}
 
         if name is not None:
             name = str(name)
@@ -129,6 +182,7 @@ def edit_user(id: str = 'self'):
             if name == user.name:
                 raise DataValidationError('Name not changed')
             user.name = name
+            changes['name'] = name
 
         if password is not None:
             password, old_password = str(password), str(old_password)
@@ -142,7 +196,25 @@ def edit_user(id: str = 'self'):
             if not current_user.has_rights('iam_users_manage'):
                 raise DataValidationError("User doesn't have permissions to edit group list", 403)
             user.groups = Group.query.filter(Group.name.in_(groups)).all()
+            bump_versions(Group, [group.id for group in user.groups])
+            changes['groups'] = [group.id for group in user.groups]
+            revocation_list.revoke_user_tokens(user.id, refresh=False)
+
+        if active is not None:
+            if not current_user.has_rights('iam_users_manage'):
+                raise DataValidationError("User doesn't have permissions to change activity", 403)
+            user.active = bool(active)
+            changes['active'] = user.active
+            if not user.active:
+                revocation_list.revoke_user_tokens(user.id)
+        bump_user_version(user.id)
+        bump_generation(USERS_GENERATION)
+        change_feed.record('user', user.id, 'update', changes)
+        user_id = user.id
         db.session.commit()
+        if groups is not None:
+            # Read before the commit, which expires the user and would reload it.
+            permission_cache.invalidate(user_id)
 
         return jsonify({'error': None})
 
@@ -154,6 +226,7 @@ def edit_user(id: str = 'self'):
 
 @delete_user_route.route('/api/iam/user/<id>', methods=['DELETE'])
 @jwt_required()
+@query_budget(10)
 def delete_user(id: str = 'self'):
     try:
         id = int(id)
@@ -174,6 +247,50 @@ def delete_user(id: str = 'self'):
     if user is None:
         return {'error': 'User not found.'}, 404
 
+    user_id = user.id
+    revocation_list.revoke_user_tokens(user_id)
+    bump_user_groups(user_id)
+    bump_generation(USERS_GENERATION)
+    change_feed.record('user', user_id, 'delete')
     db.session.delete(user)
     db.session.commit()
+    permission_cache.invalidate(user_id)
     return jsonify({'error': None})
+
+
+@import_users_route.route('/api/iam/user/import', methods=['POST'])
+@jwt_required()
+def import_users_endpoint():
+    current_user = IamJwtUser()
+
+    if not current_user.has_rights('iam_users_manage'):
+        return jsonify({
+            'error': f"User {current_user.identity['username']} doesn't have permissions to import users"
+        }), 403
+
+    fmt = 'csv' if request.mimetype == 'text/csv' else 'ndjson'
+    chunk_size = current_app.config['BULK_IMPORT_CHUNK_SIZE']
+
+    def report():
+        for entry in import_users(parse_rows(request.stream, fmt), chunk_size):
+            yield json.dumps(entry) + '\n'
+
+    return Response(stream_with_context(report()), mimetype='application/x-ndjson')
+
+
+@export_users_route.route('/api/iam/user/export', methods=['GET'])
+@jwt_required()
+def export_users_endpoint():
+    current_user = IamJwtUser()
+
+    if not current_user.has_rights('iam_users_manage'):
+        return jsonify({
+            'error': f"User {current_user.identity['username']} doesn't have permissions to export users"
+        }), 403
+
+    fmt = 'csv' if request.args.get('format', 'ndjson') == 'csv' else 'ndjson'
+    rows = export_users(current_app.config['EXPORT_BATCH_SIZE'])
+    return Response(
+        stream_with_context(format_rows(rows, fmt)),
+        mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    )
@@ -0,0 +1,75 @@
+import os
+
+import flask_migrate
+import pytest
+from sqlalchemy import event
+
+import iam
+from iam.models import db
+
+MIGRATIONS = os.path.join(os.path.dirname(iam.__file__), 'migrations')
+
+
+@pytest.fixture
+def extra_settings() -> dict:
+    # Overridden by test modules that need a differently configured app.
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch, extra_settings):
+    settings = tmp_path / 'settings.py'
+    settings.write_text(
+        f"SQLALCHEMY_DATABASE_URI = 'sqlite:///{tmp_path}/iam.db'\n"
+        "TESTING = True\n"
+        "PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'\n"
+        + ''.join(f'{key} = {value!r}\n' for key, value in extra_settings.items())
+    )
+    monkeypatch.setenv('IAM_SETTINGS', str(settings))
+    app = iam.create_app()
+    with app.app_context():
+        flask_migrate.upgrade(directory=MIGRATIONS)
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_headers(client):
+    response = client.post('/api/iam/token', json={'username': 'admin', 'password': 'admin'})
+    assert response.status_code == 200
+    return {'Authorization': 'Bearer ' + response.json['access_token']}
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if not statement.startswith('BEGIN'):
+            self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@pytest.fixture
+def count_statements(app):
+    with app.app_context():
+        engine = db.engine
+    return lambda: StatementCounter(engine)
@@ -0,0 +1,31 @@
+import pytest
+
+from iam.library.authorize import validate_checks
+from iam.library.validate import DataValidationError
+
+
+@pytest.mark.parametrize('checks', [
+    ['ab'],
+    [{'user_id': 'u', 'permission': 'p'}],
+    [['u', 'p', 'x']],
+    [['u', 5]],
+    [[None, 'p']],
+    'ab',
+])
+def test_malformed_checks_are_rejected(checks):
+    with pytest.raises(DataValidationError):
+        validate_checks(checks, 10)
+
+
+def test_checks_are_pairs_of_strings():
+    assert validate_checks([['u', 'p'], ('v', 'q')], 10) == [('u', 'p'), ('v', 'q')]
+
+
+def test_authorize_rejects_a_string_pair(client, admin_headers):
+    response = client.post('/api/iam/authorize', headers=admin_headers, json={'checks': ['ab']})
+    assert response.status_code == 400
+
+
+def test_authorize_rejects_non_string_users(client, admin_headers):
+    response = client.post('/api/iam/authorize', headers=admin_headers, json={'permission': 'p', 'users': [1]})
+    assert response.status_code == 400
@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+IMPORT = '/api/iam/user/import'
+
+
+@pytest.fixture
+def post_import(client, admin_headers):
+    def post(body: bytes, content_type: str) -> list:
+        response = client.post(IMPORT, headers=admin_headers, data=body, content_type=content_type)
+        assert response.status_code == 200
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    return post
+
+
+def test_ndjson_rows_of_the_wrong_type_are_row_errors(post_import):
+    rows = [
+        {'username': 'numbername', 'password': 'secret123', 'name': 5},
+        {'username': 'objectname', 'password': 'secret123', 'name': {}},
+        {'username': ['listuser'], 'password': 'secret123'},
+        {'username': 'nopassword'},
+        {'username': 'valid', 'password': 'secret123'},
+    ]
+    body = '\n'.join(json.dumps(row) for row in rows).encode() + b'\n\xff\xfe\n'
+    report = post_import(body, 'application/x-ndjson')
+    assert [entry.get('row') for entry in report[:-1]] == [2, 3, 4, 6]
+    assert report[-1] == {'imported': 2, 'failed': 4}
+
+
+def test_undecodable_csv_ends_the_import_with_a_record(post_import):
+    body = b'username,password,name\ncsvuser,secret123,C\n\xff\xfe,secret123,X\nlater,secret123,L\n'
+    report = post_import(body, 'text/csv')
+    assert report[-2]['error'] == 'Input is not valid UTF-8, import stopped.'
+    assert report[-1] == {'imported': 1, 'failed': 1}
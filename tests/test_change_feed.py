@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+
+import pytest
+
+from iam.library.change_feed import compact_changes
+
+
+@pytest.fixture
+def extra_settings():
+    # Short streams and polls, so SSE responses end within the test.
+    return {'CHANGE_FEED_STREAM_MAX': 0.5, 'CHANGE_FEED_POLL_INTERVAL': 0.1, 'CHANGE_FEED_MAX_WAIT': 5}
+
+
+def changes(client, headers, **params):
+    response = client.get('/api/iam/changes', headers=headers, query_string=params)
+    assert response.status_code == 200, response.json
+    return response.json
+
+
+def create_group(client, headers, name):
+    assert client.post('/api/iam/group', headers=headers, json={'name': name}).status_code == 200
+
+
+def test_cursor_follows_the_feed_from_the_current_position(client, admin_headers):
+    create_group(client, admin_headers, 'before')
+    start = changes(client, admin_headers)
+    assert start['data'] == []
+
+    for name in ('first', 'second', 'third'):
+        create_group(client, admin_headers, name)
+    page = changes(client, admin_headers, since=start['next'], per_page=2)
+    assert [(c['entity'], c['action'], c['data']['name']) for c in page['data']] == [
+        ('group', 'create', 'first'), ('group', 'create', 'second')
+    ]
+    assert page['next'] == page['data'][-1]['id']
+    rest = changes(client, admin_headers, since=page['next'])
+    assert [c['data']['name'] for c in rest['data']] == ['third']
+    assert changes(client, admin_headers, since=rest['next']) == {'error': None, 'data': [], 'next': rest['next']}
+
+    response = client.get('/api/iam/changes?since=abc', headers=admin_headers)
+    assert response.status_code == 400
+
+
+def test_compacted_cursors_are_gone(app, client, admin_headers):
+    start = changes(client, admin_headers)['next']
+    create_group(client, admin_headers, 'older')
+    with app.app_context():
+        assert compact_changes(retention=-1) > 0
+    response = client.get('/api/iam/changes', headers=admin_headers, query_string={'since': start})
+    assert response.status_code == 410 and response.json['error']
+
+    # A fresh cursor starts after the compacted ids, and ids are never reused.
+    fresh = changes(client, admin_headers)['next']
+    create_group(client, admin_headers, 'newer')
+    assert [c['data']['name'] for c in changes(client, admin_headers, since=fresh)['data']] == ['newer']
+
+
+def test_feed_only_lists_entities_the_reader_manages(client, admin_headers):
+    create_group(client, admin_headers, 'group-admins')
+    group_id = client.get('/api/iam/group?search=group-admins', headers=admin_headers).json['data'][0]['id']
+    client.put(f'/api/iam/group/{group_id}', headers=admin_headers, json={'permissions': ['iam_group_manage']})
+    memberships = {'carol': ['group-admins'], 'dave': []}
+    for username, groups in memberships.items():
+        client.post('/api/iam/user', json={'username': username, 'password': 'secret123', 'name': username})
+        user_id = client.get(f'/api/iam/user?search={username}', headers=admin_headers).json['data'][0]['id']
+        client.put(f'/api/iam/user/{user_id}', headers=admin_headers, json={'active': True, 'groups': groups})
+
+    def headers_of(username):
+        token = client.post('/api/iam/token', json={'username': username, 'password': 'secret123'}).json
+        return {'Authorization': 'Bearer ' + token['access_token']}
+
+    carol = headers_of('carol')
+    assert client.get('/api/iam/changes', headers=headers_of('dave')).status_code == 403
+    everything = changes(client, admin_headers, since=0)['data']
+    assert {c['entity'] for c in everything} >= {'user', 'group'}
+    assert changes(client, carol, since=0)['data'] == [c for c in everything if c['entity'] == 'group']
+
+
+def test_long_poll_wakes_up_on_a_commit(client, admin_headers):
+    since = changes(client, admin_headers)['next']
+    writer = threading.Timer(0.3, create_group, (client, admin_headers, 'late'))
+    started = time.monotonic()
+    writer.start()
+    try:
+        page = changes(client, admin_headers, since=since, wait=5)
+    finally:
+        writer.join()
+    assert time.monotonic() - started < 3
+    assert [c['data']['name'] for c in page['data']] == ['late']
+
+
+def test_event_stream_frames(client, admin_headers):
+    since = changes(client, admin_headers)['next']
+    create_group(client, admin_headers, 'streamed')
+    response = client.get('/api/iam/changes', query_string={'since': since},
+                          headers={**admin_headers, 'Accept': 'text/event-stream'})
+    assert response.mimetype == 'text/event-stream'
+    frames = [frame for frame in response.get_data(as_text=True).split('\n\n') if frame]
+    assert len(frames) == 1
+    id_line, event_line, data_line = frames[0].split('\n')
+    change = json.loads(data_line[len('data: '):])
+    assert id_line == f'id: {change["id"]}' and event_line == 'event: change'
+    assert change['data']['name'] == 'streamed'
+
+    # EventSource reconnects with Last-Event-ID instead of a since parameter.
+    response = client.get('/api/iam/changes', headers={
+        **admin_headers, 'Accept': 'text/event-stream', 'Last-Event-ID': str(change['id'])
+    })
+    assert response.get_data(as_text=True) == ''
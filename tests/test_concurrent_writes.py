@@ -0,0 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
+
+WRITERS = 8
+ROUNDS = 10
+
+
+def test_concurrent_writers_never_see_a_locked_database(app, client, admin_headers):
+    client.post('/api/iam/permission', headers=admin_headers, json={'name': 'shared_perm', 'description': 'x'})
+    permission_id = client.get('/api/iam/permission/?search=shared_perm', headers=admin_headers).json['data'][0]['id']
+    group_ids = []
+    for writer in range(WRITERS):
+        client.post('/api/iam/group', headers=admin_headers, json={'name': f'writer{writer}'})
+        group_ids.append([
+            group['id'] for group in client.get(f'/api/iam/group?search=writer{writer}', headers=admin_headers).json['data']
+        ][0])
+
+    def write(writer: int) -> list:
+        # Each writer reads then writes rows the others write too, like the edit endpoints do.
+        writer_client = app.test_client()
+        statuses = []
+        for i in range(ROUNDS):
+            statuses += [
+                writer_client.post('/api/iam/user', json={
+                    'username': f'writer{writer}-{i}', 'password': 'secret123', 'name': 'w'
+                }).status_code,
+                writer_client.put(f'/api/iam/permission/{permission_id}', headers=admin_headers, json={
+                    'description': f'{writer}-{i}'
+                }).status_code,
+                writer_client.put(f'/api/iam/group/{group_ids[writer]}', headers=admin_headers, json={
+                    'name': f'writer{writer}-round{i}', 'permissions': ['shared_perm']
+                }).status_code,
+            ]
+        return statuses
+
+    # Exceptions propagate under TESTING, so an OperationalError ('database is locked') fails here.
+    with ThreadPoolExecutor(WRITERS) as pool:
+        statuses = [status for result in pool.map(write, range(WRITERS)) for status in result]
+
+    assert len(statuses) == WRITERS * ROUNDS * 3
+    assert set(statuses) <= {200, 201}, statuses
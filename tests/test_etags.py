@@ -0,0 +1,124 @@
+from iam.library.authz_version import bump_global_version
+from iam.models import db, User, Permission
+
+
+def revalidate(client, headers, path, response):
+    return client.get(path, headers={**headers, 'If-None-Match': response.headers['ETag']})
+
+
+def test_user_body_follows_another_workers_permission_edit(app, client, admin_headers):
+    with app.app_context():
+        admin_id = User.query.filter_by(username='admin').one().id
+    path = f'/api/iam/user/{admin_id}'
+    before = client.get(path, headers=admin_headers)
+    assert revalidate(client, admin_headers, path, before).status_code == 304
+
+    # Another worker grants a permission: the generation moves, this process's cache isn't told.
+    with app.app_context():
+        group = User.query.get(admin_id).groups[0]
+        group.permissions.append(Permission(name='billing_read', description='x'))
+        bump_global_version()
+        db.session.commit()
+
+    after = revalidate(client, admin_headers, path, before)
+    assert after.status_code == 200
+    assert 'billing_read' in after.json['data']['permissions']
+    assert revalidate(client, admin_headers, path, after).status_code == 304
+
+
+def test_parent_group_revalidates_after_a_subgroup_rename_or_delete(app, client, admin_headers):
+    for name in ('parent', 'child'):
+        client.post('/api/iam/group', headers=admin_headers, json={'name': name})
+    ids = {g['name']: g['id'] for g in client.get('/api/iam/group?per_page=100', headers=admin_headers).json['data']}
+    client.put(f'/api/iam/group/{ids["parent"]}', headers=admin_headers, json={'groups': ['child']})
+    paths = [f'/api/iam/group/{ids["parent"]}', f'/api/iam/group/{ids["parent"]}/groups']
+    responses = [client.get(path, headers=admin_headers) for path in paths]
+
+    client.put(f'/api/iam/group/{ids["child"]}', headers=admin_headers, json={'name': 'renamed'})
+    renamed = [revalidate(client, admin_headers, path, r) for path, r in zip(paths, responses)]
+    assert [r.status_code for r in renamed] == [200, 200]
+    assert renamed[0].json['data']['groups'][0]['name'] == 'renamed'
+
+    client.delete(f'/api/iam/group/{ids["child"]}', headers=admin_headers)
+    deleted = [revalidate(client, admin_headers, path, r) for path, r in zip(paths, renamed)]
+    assert [r.status_code for r in deleted] == [200, 200]
+    assert deleted[0].json['data']['groups_count'] == 0
+
+
+def assert_changed_by(client, headers, paths, change):
+    # Every path revalidates to 304, then to a fresh 200 after `change`, then to 304 again.
+    before = [client.get(path, headers=headers) for path in paths]
+    assert [revalidate(client, headers, path, r).status_code for path, r in zip(paths, before)] == [304] * len(paths)
+    response = change()
+    assert response.status_code in (200, 201), response.get_data(as_text=True)
+    after = [revalidate(client, headers, path, r) for path, r in zip(paths, before)]
+    assert [r.status_code for r in after] == [200] * len(paths), paths
+    assert [revalidate(client, headers, path, r).status_code for path, r in zip(paths, after)] == [304] * len(paths)
+    return after
+
+
+def ids_by_name(client, headers, path):
+    return {row.get('name'): row['id'] for row in client.get(f'{path}?per_page=100', headers=headers).json['data']}
+
+
+def test_user_etags_follow_user_edits(client, admin_headers):
+    client.post('/api/iam/user', json={'username': 'alice', 'password': 'secret123', 'name': 'Alice'})
+    client.post('/api/iam/group', headers=admin_headers, json={'name': 'crew'})
+    alice = ids_by_name(client, admin_headers, '/api/iam/user')['Alice']
+    path = f'/api/iam/user/{alice}'
+
+    after = assert_changed_by(client, admin_headers, [path], lambda: client.put(
+        path, headers=admin_headers, json={'name': 'Alicia'}))
+    assert after[0].json['data']['name'] == 'Alicia'
+    after = assert_changed_by(client, admin_headers, [path], lambda: client.put(
+        path, headers=admin_headers, json={'groups': ['crew']}))
+    assert after[0].json['data']['groups'] == ['crew']
+
+
+def test_group_etags_follow_member_edits(client, admin_headers):
+    client.post('/api/iam/user', json={'username': 'alice', 'password': 'secret123', 'name': 'Alice'})
+    client.post('/api/iam/group', headers=admin_headers, json={'name': 'crew'})
+    client.post('/api/iam/permission', headers=admin_headers, json={'name': 'deploy', 'description': 'x'})
+    alice = ids_by_name(client, admin_headers, '/api/iam/user')['Alice']
+    crew = ids_by_name(client, admin_headers, '/api/iam/group')['crew']
+    deploy = ids_by_name(client, admin_headers, '/api/iam/permission/')['deploy']
+    detail, users, permissions = (f'/api/iam/group/{crew}{suffix}' for suffix in ('', '/users', '/permissions'))
+
+    assert_changed_by(client, admin_headers, [detail, users], lambda: client.put(
+        f'/api/iam/user/{alice}', headers=admin_headers, json={'groups': ['crew']}))
+    after = assert_changed_by(client, admin_headers, [detail, users], lambda: client.put(
+        f'/api/iam/user/{alice}', headers=admin_headers, json={'name': 'Alicia'}))
+    assert after[1].json['data'][0]['name'] == 'Alicia'
+
+    assert_changed_by(client, admin_headers, [detail, permissions], lambda: client.put(
+        f'/api/iam/group/{crew}', headers=admin_headers, json={'permissions': ['deploy']}))
+    after = assert_changed_by(client, admin_headers, [detail, permissions], lambda: client.put(
+        f'/api/iam/permission/{deploy}', headers=admin_headers, json={'name': 'release'}))
+    assert after[1].json['data'][0]['name'] == 'release'
+
+
+def test_permission_etags_follow_group_edits(client, admin_headers):
+    client.post('/api/iam/group', headers=admin_headers, json={'name': 'crew'})
+    client.post('/api/iam/permission', headers=admin_headers, json={'name': 'deploy', 'description': 'x'})
+    crew = ids_by_name(client, admin_headers, '/api/iam/group')['crew']
+    deploy = ids_by_name(client, admin_headers, '/api/iam/permission/')['deploy']
+    paths = [f'/api/iam/permission/{deploy}', f'/api/iam/permission/{deploy}/groups']
+
+    assert_changed_by(client, admin_headers, paths, lambda: client.put(
+        f'/api/iam/group/{crew}', headers=admin_headers, json={'permissions': ['deploy']}))
+    after = assert_changed_by(client, admin_headers, paths, lambda: client.put(
+        f'/api/iam/group/{crew}', headers=admin_headers, json={'name': 'team'}))
+    assert after[1].json['data'][0]['name'] == 'team'
+    after = assert_changed_by(client, admin_headers, paths, lambda: client.delete(
+        f'/api/iam/group/{crew}', headers=admin_headers))
+    assert after[1].json['data'] == []
+
+
+def test_collection_etags_follow_creates(client, admin_headers):
+    assert_changed_by(client, admin_headers, ['/api/iam/user', '/api/iam/user?after='], lambda: client.post(
+        '/api/iam/user', json={'username': 'alice', 'password': 'secret123', 'name': 'Alice'}))
+    assert_changed_by(client, admin_headers, ['/api/iam/group', '/api/iam/group?after='], lambda: client.post(
+        '/api/iam/group', headers=admin_headers, json={'name': 'crew'}))
+    assert_changed_by(client, admin_headers, ['/api/iam/permission/', '/api/iam/permission/?after='],
+                      lambda: client.post('/api/iam/permission', headers=admin_headers,
+                                          json={'name': 'deploy', 'description': 'x'}))
@@ -0,0 +1,22 @@
+import csv
+import io
+import json
+
+from iam.library.authz_version import bump_global_version
+from iam.models import db, User, Group, Permission
+
+
+def test_csv_list_cells_survive_separators_in_names(app, client, admin_headers):
+    with app.app_context():
+        group = Group(name='ops; on-call, "east"', permissions=[Permission(name='deploy;prod', description='x')])
+        db.session.add(User(username='oncall', name='o', password='secret123', groups=[group]))
+        bump_global_version()
+        db.session.commit()
+
+    response = client.get('/api/iam/user/export?format=csv', headers=admin_headers)
+    assert response.status_code == 200
+    rows = csv.DictReader(io.StringIO(response.get_data(as_text=True)))
+    row = [row for row in rows if row['username'] == 'oncall'][0]
+    assert json.loads(row['groups']) == ['ops; on-call, "east"']
+    assert json.loads(row['effective_groups']) == ['ops; on-call, "east"']
+    assert json.loads(row['permissions']) == ['deploy;prod']
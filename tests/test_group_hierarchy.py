@@ -0,0 +1,79 @@
+import pytest
+
+from iam.library.export import export_users
+from iam.library.group_hierarchy import _rebuild, set_subgroups
+from iam.library.validate import DataValidationError
+from iam.models import db, User, Group, Permission, group_closure
+
+
+@pytest.fixture
+def nested(app):
+    # staff > team > squad, with the user directly in squad only.
+    with app.app_context():
+        staff = Group(name='staff', permissions=[Permission(name='staff:read', description='x')])
+        team = Group(name='team', permissions=[Permission(name='team:read', description='x')])
+        squad = Group(name='squad')
+        db.session.add_all([staff, team, squad,
+                            User(username='member', name='m', password='secret123', active=True, groups=[squad])])
+        db.session.commit()
+        ids = {group.name: group.id for group in (staff, team, squad)}
+    return ids
+
+
+def link(client, headers, parent_id, children):
+    response = client.put(f'/api/iam/group/{parent_id}', headers=headers, json={'groups': children})
+    assert response.status_code == 200, response.json
+    return response
+
+
+def test_identity_separates_direct_and_inherited_groups(app, client, admin_headers, nested):
+    link(client, admin_headers, nested['staff'], ['team'])
+    link(client, admin_headers, nested['team'], ['squad'])
+
+    token = client.post('/api/iam/token', json={'username': 'member', 'password': 'secret123'}).json
+    own = client.get('/api/iam/user/self', headers={'Authorization': 'Bearer ' + token['access_token']}).json
+    by_id = client.get(f'/api/iam/user/{own["id"]}', headers=admin_headers).json['data']
+    for identity in (own, by_id):
+        assert identity['groups'] == ['squad']
+        assert sorted(identity['effective_groups']) == ['squad', 'staff', 'team']
+        assert sorted(identity['permissions']) == ['staff:read', 'team:read']
+
+    with app.app_context():
+        user = User.query.filter_by(username='member').one()
+        assert user.identity['groups'] == ['squad']
+        assert sorted(user.identity['effective_groups']) == ['squad', 'staff', 'team']
+        row = [row for row in export_users(batch_size=10) if row['username'] == 'member'][0]
+        assert row['groups'] == ['squad'] and sorted(row['effective_groups']) == ['squad', 'staff', 'team']
+
+
+def closure_rows() -> set:
+    return set(db.session.query(group_closure.c.ancestor_id, group_closure.c.descendant_id, group_closure.c.depth))
+
+
+@pytest.mark.filterwarnings('error::sqlalchemy.exc.SAWarning')
+def test_added_edges_extend_the_closure_like_a_full_rebuild(app, count_statements):
+    # A chain, then a shortcut across it, a new root above it and a diamond below it.
+    edges = [(0, 1), (1, 2), (2, 3), (0, 3), (4, 0), (2, 5), (1, 5), (5, 6), (3, 6)]
+    with app.app_context():
+        groups = [Group(name=f'g{i}') for i in range(7)]
+        db.session.add_all(groups)
+        db.session.commit()
+        ids = [group.id for group in groups]
+        children = {i: set() for i in range(7)}
+        for parent, child in edges:
+            children[parent].add(child)
+            with count_statements() as counter:
+                assert set_subgroups(ids[parent], [ids[i] for i in children[parent]])
+            db.session.commit()
+            assert not [s for s in counter.statements if s.startswith('DELETE')], counter.statements
+
+            incremental = closure_rows()
+            _rebuild(ids)
+            assert closure_rows() == incremental
+            db.session.rollback()
+
+        depths = {(a, d): depth for a, d, depth in closure_rows()}
+        assert depths[ids[0], ids[3]] == 1 and depths[ids[4], ids[6]] == 3
+
+        with pytest.raises(DataValidationError):
+            set_subgroups(ids[6], [ids[4]])
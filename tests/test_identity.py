@@ -0,0 +1,67 @@
+import pytest
+
+from iam import models
+from iam.library.authz_version import AUTHZ_GENERATION, bump_generation
+from iam.library.export import export_users
+from iam.library.identity import load_identity
+from iam.library.permission_cache import permission_cache
+from iam.models import db, User, Group, Permission
+
+GROUPS = 20
+
+
+@pytest.fixture
+def users(app):
+    with app.app_context():
+        groups = [
+            Group(name=f'group{i}', permissions=[Permission(name=f'perm{i}', description='x')])
+            for i in range(GROUPS)
+        ]
+        db.session.add_all([
+            User(username='nogroups', name='n', password='secret123'),
+            User(username='onegroup', name='o', password='secret123', groups=groups[:1]),
+            User(username='manygroups', name='m', password='secret123', groups=groups),
+        ])
+        db.session.commit()
+
+
+@pytest.mark.parametrize('username, groups', [('nogroups', 0), ('onegroup', 1), ('manygroups', GROUPS)])
+def test_load_identity_is_one_statement(app, users, count_statements, username, groups):
+    with app.app_context():
+        # The graph snapshot is loaded once per authz generation, not per identity.
+        load_identity(username='admin')
+        db.session.expunge_all()
+        permission_cache.clear()
+
+        with count_statements() as counter:
+            user, identity, versions = load_identity(username=username)
+
+        assert counter.count == 1, counter.statements
+        assert user.username == username
+        assert len(identity['groups']) == groups
+        assert sorted(identity['permissions']) == sorted(f'perm{i}' for i in range(groups))
+        assert len(versions) == 2
+
+
+def test_load_identity_unknown_user(app, count_statements):
+    with app.app_context():
+        with count_statements() as counter:
+            assert load_identity(username='nobody') == (None, None, None)
+        assert counter.count == 1
+
+
+def test_groupless_user_keeps_the_graph_snapshot(app, users, monkeypatch):
+    with app.app_context():
+        bump_generation(AUTHZ_GENERATION)
+        db.session.commit()
+        load_identity(username='admin')
+        permission_cache.clear()
+        reloads = []
+        load = models._load_rbac_graph
+        monkeypatch.setattr(models, '_load_rbac_graph', lambda: reloads.append(1) or load())
+
+        user = User.query.filter_by(username='nogroups').one()
+        assert user.identity['groups'] == [] and user.identity['permissions'] == []
+        exported = list(export_users(batch_size=1))
+        assert [row for row in exported if row['username'] == 'nogroups'][0]['groups'] == []
+        assert reloads == []
@@ -0,0 +1,32 @@
+import pytest
+
+
+@pytest.fixture
+def group_id(client, admin_headers):
+    for i in range(3):
+        client.post('/api/iam/permission', headers=admin_headers, json={'name': f'perm{i}', 'description': 'x'})
+    client.post('/api/iam/group', headers=admin_headers, json={'name': 'crew'})
+    group = client.get('/api/iam/group?search=crew', headers=admin_headers).json['data'][0]
+    response = client.put(f'/api/iam/group/{group["id"]}', headers=admin_headers,
+                          json={'permissions': ['perm0', 'perm1', 'perm2']})
+    assert response.status_code == 200
+    return group['id']
+
+
+@pytest.mark.parametrize('extra_settings', [{'MEMBERSHIP_PREVIEW_SIZE': 2}])
+def test_preview_links_to_the_rest(client, admin_headers, group_id):
+    group = client.get(f'/api/iam/group/{group_id}', headers=admin_headers).json['data']
+    assert len(group['permissions']) == 2 and group['permissions_count'] == 3
+    rest = client.get(f'/api/iam/group/{group_id}/permissions?after={group["permissions_next"]}',
+                      headers=admin_headers).json['data']
+    assert {p['name'] for p in group['permissions'] + rest} == {'perm0', 'perm1', 'perm2'}
+
+
+@pytest.mark.parametrize('extra_settings', [{'MEMBERSHIP_PREVIEW_SIZE': 0}])
+def test_zero_preview_size_returns_counts_only(client, admin_headers, group_id):
+    group = client.get(f'/api/iam/group/{group_id}', headers=admin_headers).json['data']
+    assert group['permissions'] == [] and group['permissions_count'] == 3
+    assert group['users_count'] == 0 and group['users_next'] is None
+    listed = client.get(f'/api/iam/group/{group_id}/permissions?after={group["permissions_next"]}',
+                        headers=admin_headers).json['data']
+    assert len(listed) == 3
@@ -0,0 +1,10 @@
+import flask_migrate
+
+from conftest import MIGRATIONS
+
+
+def test_models_match_migrations(app):
+    # Fails when the models and the migration head disagree, e.g. when autogenerate
+    # would drop the hand-made search indexes.
+    with app.app_context():
+        flask_migrate.check(directory=MIGRATIONS)
@@ -0,0 +1,20 @@
+import pytest
+
+from iam.library.pagination import decode_cursor, encode_cursor
+from iam.library.validate import DataValidationError
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor('abc')) == 'abc'
+
+
+@pytest.mark.parametrize('cursor', ['e30', 'W10', 'W1tdXQ', 'bnVsbA', 'not base64!', 'IjEi'])
+def test_malformed_cursor_is_invalid(cursor):
+    with pytest.raises(DataValidationError):
+        decode_cursor(cursor)
+
+
+def test_malformed_cursor_is_a_400(client, admin_headers):
+    response = client.get('/api/iam/user?after=e30', headers=admin_headers)
+    assert response.status_code == 400
+    assert response.json['error'] == 'Invalid cursor.'
@@ -0,0 +1,21 @@
+from threading import Thread
+
+from werkzeug.security import check_password_hash
+
+from iam.library.password import PasswordHasher
+
+
+def test_hash_many_leaves_room_for_logins():
+    hasher = PasswordHasher()
+    hasher.configure(method='pbkdf2:sha256:20000', executor='thread', workers=2, queue_limit=4, timeout=0.5)
+    passwords = [f'password{i}' for i in range(200)]
+    result = {}
+    batch = Thread(target=lambda: result.setdefault('hashes', hasher.hash_many(passwords)))
+    batch.start()
+    # Logins queue behind at most one round of batch hashes: no HasherBusyError, neither
+    # for a missing slot nor for waiting longer than the timeout.
+    while batch.is_alive():
+        assert hasher.check(hasher.hash('secret123'), 'secret123')
+    batch.join()
+    assert len(result['hashes']) == len(passwords)
+    assert all(check_password_hash(h, p) for h, p in zip(result['hashes'][:5], passwords))
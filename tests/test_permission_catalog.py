@@ -0,0 +1,54 @@
+import pytest
+from flask_jwt_extended import create_access_token, decode_token
+
+from iam.library.authz_version import AUTHZ_GENERATION, bump_generation
+from iam.library.permission_catalog import clear_catalogs, current_catalog, get_catalog
+from iam.models import db, User, Permission
+
+
+@pytest.fixture
+def compact(app):
+    app.config['JWT_COMPACT_PERMISSIONS'] = True
+
+
+def test_compact_token_survives_a_restart(app, client, compact, admin_headers):
+    with app.app_context():
+        assert 'perm_catalog' in decode_token(admin_headers['Authorization'][7:])['sub']
+    # Another worker, or this one after a restart: nothing about the catalog in memory.
+    clear_catalogs()
+    response = client.get('/api/iam/user', headers=admin_headers)
+    assert response.status_code == 200
+
+
+def test_unknown_catalog_is_rejected(app, client, compact):
+    with app.app_context():
+        token = create_access_token(identity={
+            'id': 'x', 'active': True, 'username': 'forged', 'name': 'forged',
+            'groups': [], 'perm_catalog': 'ffffffffffff', 'perm_bits': '_w'
+        })
+    response = client.get('/api/iam/user', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 401
+    assert response.json['error']
+
+
+def test_catalog_miss_keeps_current_catalog(app, count_statements):
+    with app.app_context():
+        catalog = current_catalog()
+        assert get_catalog('ffffffffffff') is None
+        with count_statements() as counter:
+            assert current_catalog() is catalog
+        assert counter.count == 0
+
+
+def test_permission_granted_by_another_worker_is_encoded(app, client, compact, admin_headers):
+    # This worker's catalog is warm; another worker then creates and grants a permission.
+    with app.app_context():
+        admin = User.query.filter_by(username='admin').one()
+        admin.groups[0].permissions.append(Permission(name='billing_read', description='x'))
+        bump_generation(AUTHZ_GENERATION)
+        db.session.commit()
+
+    response = client.post('/api/iam/token', json={'username': 'admin', 'password': 'admin'})
+    with app.app_context():
+        identity = decode_token(response.json['access_token'])['sub']
+        assert 'billing_read' in get_catalog(identity['perm_catalog']).decode(identity['perm_bits'])
@@ -0,0 +1,150 @@
+import json
+
+import pytest
+from flask import request, request_finished
+
+from iam.library.query_budget import QueryBudget, QueryBudgetExceeded, query_budgets
+
+# Enough rows that a query per group, permission or member would push a route over its budget.
+N = 5
+
+
+@pytest.fixture
+def extra_settings():
+    return {'METRICS_ENABLED': True}
+
+
+@pytest.fixture
+def seeded(client, admin_headers):
+    names = {'groups': [f'grp{i}' for i in range(N)], 'permissions': [f'perm{i}' for i in range(N)]}
+    for i in range(N):
+        client.post('/api/iam/permission', headers=admin_headers, json={'name': f'perm{i}', 'description': 'x'})
+        client.post('/api/iam/group', headers=admin_headers, json={'name': f'grp{i}'})
+        client.post('/api/iam/user', json={'username': f'user{i}', 'password': 'secret123', 'name': f'U{i}'})
+    groups = client.get('/api/iam/group?per_page=100', headers=admin_headers).json['data']
+    ids = {group['name']: group['id'] for group in groups}
+    for i, name in enumerate(names['groups']):
+        client.put(f'/api/iam/group/{ids[name]}', headers=admin_headers, json={
+            'permissions': names['permissions'], 'groups': names['groups'][i + 1:i + 2]
+        })
+    users = client.get('/api/iam/user?per_page=100', headers=admin_headers).json['data']
+    user_ids = {user['username']: user['id'] for user in users}
+    for username, user_id in user_ids.items():
+        client.put(f'/api/iam/user/{user_id}', headers=admin_headers, json={'groups': [g['name'] for g in groups]})
+    return {'group_ids': ids, 'user_ids': user_ids, **names}
+
+
+@pytest.fixture
+def hit_endpoints(app):
+    hit = set()
+
+    def record(sender, response, **extra):
+        hit.add(request.endpoint)
+
+    request_finished.connect(record, app)
+    yield hit
+    request_finished.disconnect(record, app)
+
+
+def test_budgets_are_enforced_under_testing(app):
+    assert app.testing and query_budgets.mode == 'raise'
+    with app.app_context():
+        from iam.models import db, User
+        with pytest.raises(QueryBudgetExceeded):
+            with QueryBudget(0, 'zero'):
+                db.session.query(User).first()
+
+
+def test_every_route_stays_within_its_budget(app, client, seeded, hit_endpoints):
+    # Under TESTING a route over its budget raises QueryBudgetExceeded, which the test client re-raises.
+    def call(method: str, path: str, expected: int = 200, **kwargs):
+        response = client.open(path, method=method, **kwargs)
+        assert response.status_code == expected, (method, path, response.get_data(as_text=True))
+        return response
+
+    tokens = call('POST', '/api/iam/token', json={'username': 'admin', 'password': 'admin'}).json
+    H = {'Authorization': 'Bearer ' + tokens['access_token']}
+    call('GET', '/api/iam/token', headers={'Authorization': 'Bearer ' + tokens['refresh_token']})
+
+    group_id, user_id = seeded['group_ids']['grp0'], seeded['user_ids']['user0']
+    call('POST', '/api/iam/user', 201, json={'username': 'newbie', 'password': 'secret123', 'name': 'N'})
+    call('GET', '/api/iam/user', headers=H)
+    call('GET', '/api/iam/user?after=', headers=H)
+    call('GET', '/api/iam/user?search=user', headers=H)
+    call('GET', '/api/iam/user/self', headers=H)
+    call('GET', f'/api/iam/user/{user_id}', headers=H)
+    call('PUT', f'/api/iam/user/{user_id}', headers=H, json={'name': 'Renamed', 'groups': seeded['groups'][:2]})
+
+    call('GET', '/api/iam/group', headers=H)
+    call('GET', '/api/iam/group?after=', headers=H)
+    call('GET', f'/api/iam/group/{group_id}', headers=H)
+    call('GET', f'/api/iam/group/{group_id}/users', headers=H)
+    call('GET', f'/api/iam/group/{group_id}/permissions', headers=H)
+    call('GET', f'/api/iam/group/{group_id}/groups', headers=H)
+    call('PUT', f'/api/iam/group/{group_id}', headers=H, json={
+        'permissions': seeded['permissions'], 'groups': seeded['groups'][2:4]
+    })
+    call('POST', '/api/iam/group', headers=H, json={'name': 'zzzgroup'})
+    zzz_group = call('GET', '/api/iam/group?search=zzzgroup', headers=H).json['data'][0]['id']
+    call('DELETE', f'/api/iam/group/{zzz_group}', headers=H)
+
+    call('GET', '/api/iam/permission/', headers=H)
+    call('GET', '/api/iam/permission/?after=', headers=H)
+    permission_id = call('GET', '/api/iam/permission/?search=perm0', headers=H).json['data'][0]['id']
+    call('GET', f'/api/iam/permission/{permission_id}', headers=H)
+    call('GET', f'/api/iam/permission/{permission_id}/groups', headers=H)
+    call('PUT', f'/api/iam/permission/{permission_id}', headers=H, json={'description': 'y'})
+    call('POST', '/api/iam/permission', headers=H, json={'name': 'zzzperm', 'description': 'x'})
+    zzz_permission = call('GET', '/api/iam/permission/?search=zzzperm', headers=H).json['data'][0]['id']
+    call('PUT', f'/api/iam/permission/{zzz_permission}', headers=H, json={'name': 'zzzrenamed'})
+    call('DELETE', f'/api/iam/permission/{zzz_permission}', headers=H)
+    call('GET', '/api/iam/permission/catalog', headers=H)
+
+    call('POST', '/api/iam/authorize', headers=H, json={
+        'checks': [[user_id, permission] for permission in seeded['permissions']]
+    })
+    call('POST', '/api/iam/user/import', headers={**H, 'Content-Type': 'application/x-ndjson'},
+         data='\n'.join(json.dumps({'username': f'imp{i}', 'password': 'secret123'}) for i in range(N)))
+    call('GET', '/api/iam/user/export', headers=H)
+    call('GET', '/api/iam/changes', headers=H)
+    call('GET', '/api/iam/changes?since=0', headers=H)
+    # HS256 has no public keys to publish; the route still answers within its budget.
+    call('GET', '/.well-known/jwks.json', 404)
+    call('GET', '/metrics')
+
+    newbie = call('POST', '/api/iam/token', json={'username': 'newbie', 'password': 'secret123'}).json
+    call('DELETE', '/api/iam/user/self', headers={'Authorization': 'Bearer ' + newbie['access_token']})
+    call('DELETE', '/api/iam/token', headers=H)
+
+    registered = {rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint != 'static'}
+    assert registered - hit_endpoints == set()
+
+
+
+def test_streamed_import_and_export_are_budgeted_per_chunk(app, client, admin_headers, monkeypatch):
+    # The views return before their bodies stream; a query per row must still go over budget.
+    from iam.library import bulk_import, export
+    from iam.models import db, User
+
+    validate_password, batch_rights = bulk_import.validate_password, export._batch_rights
+
+    def validate_password_per_row(password):
+        db.session.query(User.id).first()
+        validate_password(password)
+
+    def batch_rights_per_row(user_ids):
+        for user_id in user_ids:
+            db.session.query(User.id).filter_by(id=user_id).first()
+        return batch_rights(user_ids)
+
+    monkeypatch.setattr(bulk_import, 'validate_password', validate_password_per_row)
+    rows = '\n'.join(json.dumps({'username': f'imp{i}', 'password': 'secret123'}) for i in range(N))
+    with pytest.raises(QueryBudgetExceeded, match='import_users chunk'):
+        client.post('/api/iam/user/import', headers={**admin_headers, 'Content-Type': 'application/x-ndjson'},
+                    data=rows).get_data()
+
+    for i in range(N):
+        client.post('/api/iam/user', json={'username': f'user{i}', 'password': 'secret123', 'name': f'U{i}'})
+    monkeypatch.setattr(export, '_batch_rights', batch_rights_per_row)
+    with pytest.raises(QueryBudgetExceeded, match='export_users batch'):
+        client.get('/api/iam/user/export', headers=admin_headers).get_data()
@@ -0,0 +1,68 @@
+import time
+
+from flask_jwt_extended import create_access_token
+
+from iam.library.identity import load_identity
+from iam.library.revocation import RevocationList, revocation_list
+from iam.models import db, RevokedToken
+
+
+def revoke_admin_tokens(app):
+    with app.app_context():
+        user, _, _ = load_identity(username='admin')
+        revocation_list.revoke_user_tokens(user.id)
+        db.session.commit()
+        return user.id
+
+
+def test_revoke_all_covers_tokens_from_the_same_second(app, client, admin_headers):
+    with app.app_context():
+        user, identity, _ = load_identity(username='admin')
+        # No millisecond claim, like tokens issued before it existed: only the whole-second iat.
+        legacy = {'Authorization': 'Bearer ' + create_access_token(identity=identity)}
+    revoke_admin_tokens(app)
+    assert client.get('/api/iam/user/self', headers=admin_headers).status_code == 401
+    assert client.get('/api/iam/user/self', headers=legacy).status_code == 401
+
+
+def test_tokens_issued_after_revoke_all_are_valid(app, client):
+    revoke_admin_tokens(app)
+    response = client.post('/api/iam/token', json={'username': 'admin', 'password': 'admin'})
+    headers = {'Authorization': 'Bearer ' + response.json['access_token']}
+    assert client.get('/api/iam/user/self', headers=headers).status_code == 200
+
+
+def revoked(app, worker: RevocationList, jti: str) -> bool:
+    return worker.is_revoked({'jti': jti, 'type': 'access', app.config['JWT_IDENTITY_CLAIM']: {'id': 'nobody'}})
+
+
+def add_revoked(*rows):
+    db.session.add_all([RevokedToken(id=id, jti=jti, expires_at=time.time() + 60) for id, jti in rows])
+    db.session.commit()
+
+
+def test_other_workers_load_revocations_after_a_purge(app):
+    # `other` stands in for a second worker: it only learns about revocations from the table.
+    other = RevocationList(refresh_interval=0)
+    with app.app_context():
+        add_revoked((None, 'first'), (None, 'second'))
+        assert revoked(app, other, 'second')
+        RevokedToken.query.update({'expires_at': time.time() - 1})
+        db.session.commit()
+        assert app.test_cli_runner().invoke(args=['iam', 'purge-revoked-tokens']).exit_code == 0
+        # The newest row is kept, and its id is never handed out again.
+        assert [row.jti for row in RevokedToken.query] == ['second']
+        RevokedToken.query.delete()
+        add_revoked((None, 'third'))
+        assert RevokedToken.query.one().id == 3
+        assert revoked(app, other, 'third')
+
+
+def test_other_workers_load_revocations_committed_out_of_order(app):
+    other = RevocationList(refresh_interval=0)
+    with app.app_context():
+        add_revoked((1, 'one'), (3, 'three'))
+        assert revoked(app, other, 'three')
+        # Id 2 was handed out first but committed last.
+        add_revoked((2, 'two'))
+        assert revoked(app, other, 'two')
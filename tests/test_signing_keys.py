@@ -0,0 +1,63 @@
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from flask import Flask
+from flask_jwt_extended import JWTManager, jwt_required
+
+from iam.common.jwks import JwksKeyStore
+
+
+def private_pem() -> str:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+
+
+@pytest.fixture(scope='module')
+def keys() -> dict:
+    return {'active': private_pem(), 'stranger': private_pem()}
+
+
+@pytest.fixture
+def extra_settings(keys):
+    return {
+        'JWT_ALGORITHM': 'RS256',
+        'JWT_SIGNING_KID': 'k1',
+        'JWT_SIGNING_KEYS': [{'kid': 'k1', 'private_key': keys['active']}],
+    }
+
+
+def forged_token(keys, kid: str) -> str:
+    claims = {'sub': {'id': 'x', 'username': 'x', 'permissions': []}, 'type': 'access', 'fresh': False}
+    return jwt.encode(claims, keys['stranger'], algorithm='RS256', headers={'kid': kid} if kid else None)
+
+
+@pytest.mark.parametrize('kid', ['k9', None])
+def test_unknown_kid_is_a_401(client, keys, kid):
+    response = client.get('/api/iam/user/self', headers={'Authorization': f'Bearer {forged_token(keys, kid)}'})
+    assert response.status_code == 401
+
+
+def test_known_kid_still_verifies(client, admin_headers):
+    assert client.get('/api/iam/user/self', headers=admin_headers).status_code == 200
+
+
+def test_jwks_key_store_rejects_unknown_kid(client, keys, admin_headers, monkeypatch):
+    jwks = client.get('/.well-known/jwks.json').json
+    service = Flask('service')
+    service.config.update(JWT_ALGORITHM='RS256', JWT_SECRET_KEY='unused')
+    store = JwksKeyStore('http://iam/.well-known/jwks.json')
+    monkeypatch.setattr(store, '_fetch', lambda: {jwk['kid']: jwt.PyJWK(jwk).key for jwk in jwks['keys']})
+    store.init_app(JWTManager(service), service)
+
+    @service.route('/resource')
+    @jwt_required()
+    def resource():
+        return {'ok': True}
+
+    service_client = service.test_client()
+    assert service_client.get('/resource', headers=admin_headers).status_code == 200
+    forged = {'Authorization': f'Bearer {forged_token(keys, "k9")}'}
+    assert service_client.get('/resource', headers=forged).status_code == 401
@@ -0,0 +1,50 @@
+import pytest
+from flask_jwt_extended import decode_token
+
+from iam.routes import token as token_routes
+
+
+@pytest.fixture
+def tokens(client):
+    return client.post('/api/iam/token', json={'username': 'admin', 'password': 'admin'}).json
+
+
+def refresh(client, tokens) -> dict:
+    response = client.get('/api/iam/token', headers={'Authorization': 'Bearer ' + tokens['refresh_token']})
+    assert response.status_code == 200, response.json
+    return response.json
+
+
+def claims(app, token: str) -> dict:
+    with app.app_context():
+        return decode_token(token)
+
+
+def test_refresh_re_signs_the_claims_when_nothing_changed(app, client, tokens, monkeypatch):
+    def load_identity(**filters):
+        raise AssertionError('the identity should not be rebuilt')
+
+    monkeypatch.setattr(token_routes, 'load_identity', load_identity)
+    before, after = claims(app, tokens['access_token']), claims(app, refresh(client, tokens)['access_token'])
+    assert after['sub'] == before['sub'] and after['authz'] == before['authz']
+    assert after['jti'] != before['jti']
+
+
+def test_refresh_rebuilds_the_identity_after_a_user_edit(app, client, tokens, admin_headers):
+    before = claims(app, tokens['access_token'])
+    client.put(f'/api/iam/user/{before["sub"]["id"]}', headers=admin_headers, json={'name': 'Renamed'})
+    after = claims(app, refresh(client, tokens)['access_token'])
+    assert after['sub']['name'] == 'Renamed'
+    assert after['authz'][0] > before['authz'][0]
+
+
+def test_refresh_rebuilds_the_identity_after_a_group_edit(app, client, tokens, admin_headers):
+    before = claims(app, tokens['access_token'])
+    group = before['sub']['groups'][0]
+    client.post('/api/iam/permission', headers=admin_headers, json={'name': 'billing_read', 'description': 'x'})
+    group_id = client.get(f'/api/iam/group?search={group}', headers=admin_headers).json['data'][0]['id']
+    client.put(f'/api/iam/group/{group_id}', headers=admin_headers,
+               json={'permissions': before['sub']['permissions'] + ['billing_read']})
+    after = claims(app, refresh(client, tokens)['access_token'])
+    assert 'billing_read' in after['sub']['permissions']
+    assert after['authz'][1] > before['authz'][1]